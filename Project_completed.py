@@ -1,41 +1,37 @@
 import pandas as pd
-from datetime import datetime
+from permit_cache import load_workbook
+from permit_dates import CUTOFF_YEAR, job_finish, parse_dates
+from permit_trace import stage
 
 # File paths
 input_path = 'PROJECT_selected.xlsx'
 output_path = 'PROJECT_completed.xlsx'
 
-excel_file = pd.ExcelFile(input_path)
+sheets = load_workbook(input_path)
 modified_sheets = {}
 
-# Function to determine "COMPLETED"/"NOT COMPLETED" status 
-def stato_completamento(exp_date):
-    if pd.isna(exp_date):
-        return None
-    if isinstance(exp_date, str):
-        try:
-            exp_date = pd.to_datetime(exp_date, errors='coerce')
-        except:
-            return None
-    return "NOT COMPLETED" if exp_date.year >= 2025 else "COMPLETED"
+# Permits expiring in this year or later are "NOT COMPLETED"
+cutoff_year = CUTOFF_YEAR
 
-for sheet_name in excel_file.sheet_names:
-    df = excel_file.parse(sheet_name)
+for sheet_name, df in sheets.items():
     
     if 'Expiration Date' in df.columns and 'Job Start Date' in df.columns:
-        df['Expiration Date'] = pd.to_datetime(df['Expiration Date'], errors='coerce')
-        df['Job Start Date'] = pd.to_datetime(df['Job Start Date'], errors='coerce')
-        
-        # Calculate duration in days
-        df['Duration'] = (df['Expiration Date'] - df['Job Start Date']).dt.days
-        
-        # Completion status
-        df['Job Finish'] = df['Expiration Date'].apply(stato_completamento)
+        with stage("dates", sheet_name, rows_in=df) as record:
+            df['Expiration Date'] = parse_dates(df['Expiration Date'])
+            df['Job Start Date'] = parse_dates(df['Job Start Date'])
+            
+            # Calculate duration in days
+            df['Duration'] = (df['Expiration Date'] - df['Job Start Date']).dt.days
+            
+            # Completion status
+            df['Job Finish'] = job_finish(df['Expiration Date'], cutoff_year)
+            record["rows_out"] = df
         
         modified_sheets[sheet_name] = df
 
 with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
     for sheet_name, df in modified_sheets.items():
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
+        with stage("excel_write", sheet_name, rows_in=df):
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
 
 print("Completed file saved as:", output_path)
@@ -1,27 +1,86 @@
+import time
+_import_start = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import joblib
+from hvac_montecarlo import N_SAMPLES, simulate_portfolio, simulation_summary
+from scenario_index import DATE_COLUMN, build_index, exceedance_curve, lookup, options, trailing_window
+from batch_score import DEFAULTS, FEATURES, load_models as load_model_files, score
+from prediction_table import load_table, prediction_lookup
+from permit_cache import load_workbook
+from permit_schema import memory_mb, read_only_frame
+
+# matplotlib and joblib are imported only when first needed
+_import_seconds = time.perf_counter() - _import_start
+
+DATA_PATH = "total_x_ANN_e_tool_with_sequence.xlsx"
+DATA_COLUMNS = ['Work Type', 'Borough', 'Fascia_Edificio', 'Duration', 'Permit Sequence']
+# Analysis periods: trailing years of the data, or a custom range of Job Start Dates
+PERIODS = {"Totale": None, "Ultimi 10 anni": 10, "Ultimi 5 anni": 5, "Intervallo personalizzato": "custom"}
+# Scenarios (selection + seed) whose simulation summary is kept per process
+SUMMARY_CACHE_ENTRIES = 64
 
 st.set_page_config(page_title="HVAC Permit Duration Estimator", layout="centered")
 st.title(" HVAC Tool - Versione Ottimizzata")
 
-@st.cache_data
+# Seconds spent in each cold-start phase (shared by all sessions of this process)
+@st.cache_resource
+def startup_report():
+    return {}
+
+report = startup_report()
+report.setdefault("import", _import_seconds)
+
+# Reads the Parquet snapshot of the workbook (built by `python permit_cache.py <xlsx>`).
+# One read-only copy per process, shared by every session instead of a pickled copy per rerun
+@st.cache_resource
 def load_data():
-    return pd.read_excel("total_x_ANN_e_tool_with_sequence.xlsx")[[
-        'Work Type', 'Borough', 'Fascia_Edificio', 'Duration', 'Permit Sequence'
-    ]].dropna()
+    start = time.perf_counter()
+    sheets = load_workbook(DATA_PATH, columns=DATA_COLUMNS + [DATE_COLUMN])
+    data = next(iter(sheets.values()))
+    data = read_only_frame(data[[c for c in DATA_COLUMNS + [DATE_COLUMN] if c in data.columns]].dropna(subset=DATA_COLUMNS))
+    startup_report()["data"] = time.perf_counter() - start
+    return data
 
 @st.cache_resource
 def load_models():
-    model_duration = joblib.load("model_duration.pkl")
-    model_sequence = joblib.load("model_sequence.pkl")
-    encoder = joblib.load("encoder.pkl")
-    return model_duration, model_sequence, encoder
+    start = time.perf_counter()
+    models = load_model_files(".", mmap_mode="r")
+    startup_report()["models"] = time.perf_counter() - start
+    return models
 
-df = load_data()
-model_duration, model_sequence, encoder = load_models()
+# Predictions of every input combination, rebuilt only when the model files change
+@st.cache_resource
+def load_predictions(_df):
+    start = time.perf_counter()
+    predictions = prediction_lookup(load_table(".", _df, mmap_mode="r"))
+    startup_report()["predictions"] = time.perf_counter() - start
+    return predictions
+
+# Built once at load; the leading underscore keeps Streamlit from hashing the DataFrame.
+# Each segment is sorted by Job Start Date, so a period is a slice found by binary search
+@st.cache_resource
+def load_index(_df):
+    start = time.perf_counter()
+    index = build_index(_df, DATE_COLUMN if DATE_COLUMN in _df.columns else None)
+    startup_report()["index"] = time.perf_counter() - start
+    return index
+
+# Arrays of a scenario within a period (views of the index plus the period's sorted durations)
+@st.cache_resource(max_entries=SUMMARY_CACHE_ENTRIES)
+def load_segment(_index, key, period):
+    return lookup(_index, *key, *period)
+
+# Histogram counts/edges and percentiles of a scenario, computed once per (scenario, period, seed);
+# the least recently used entries are evicted beyond SUMMARY_CACHE_ENTRIES
+@st.cache_data(max_entries=SUMMARY_CACHE_ENTRIES)
+def scenario_summary(_index, key, period, seed):
+    return simulation_summary(load_segment(_index, key, period), N_SAMPLES, seed=seed)
+
+# A shallow view per rerun: it shares the buffers, and changes made through it stay in this session
+df = load_data().copy(deep=False)
+index = load_index(df)
+predictions = load_predictions(df)
 
 st.markdown("""
 Questo tool stima:
@@ -30,32 +89,50 @@ Questo tool stima:
 - Due simulazioni Monte Carlo
 """)
 
-period_choice = st.radio("Analisi Totale o Ultimi 10 anni?", ["Totale", "Ultimi 10 anni"])
+# Periods need the Job Start Date; without it only the whole dataset is available
+period_choice = st.radio("Analisi Totale o Ultimi 10 anni?", list(PERIODS) if index["dates"] else ["Totale"])
+period = (None, None)
+if PERIODS[period_choice] == "custom":
+    first, last = index["dates"]
+    chosen = st.date_input("Intervallo di Job Start Date:", (first, last), min_value=first, max_value=last)
+    if len(chosen) == 2:
+        period = tuple(chosen)
+elif PERIODS[period_choice] is not None:
+    period = trailing_window(index, PERIODS[period_choice])
+if period != (None, None):
+    st.caption(f"Permessi con Job Start Date dal {period[0]:%d/%m/%Y} al {period[1]:%d/%m/%Y}")
+
+# Only values with permits in the period are offered to the model and the simulations
 building_filter = st.radio("Analisi Totale o per Categoria di Edificio?", ["Totale", "Per categoria"])
-building_class = st.selectbox("Fascia di altezza edificio:", df['Fascia_Edificio'].unique()) if building_filter == "Per categoria" else None
+building_class = st.selectbox("Fascia di altezza edificio:", options(index, 'Fascia_Edificio', *period)) if building_filter == "Per categoria" else None
 borough_filter = st.radio("Analisi Totale o per Quartiere?", ["Totale", "Specifico"])
-borough_choice = st.selectbox("Scegli il borough:", df['Borough'].unique()) if borough_filter == "Specifico" else None
-work_type = st.selectbox("Tipo di intervento HVAC:", df['Work Type'].unique())
+borough_choice = st.selectbox("Scegli il borough:", options(index, 'Borough', *period)) if borough_filter == "Specifico" else None
+work_type = st.selectbox("Tipo di intervento HVAC:", options(index, 'Work Type', *period))
+seed = int(st.number_input("Seed della simulazione:", value=42, step=1))
 
-filtered_df = df.copy()
-if building_class:
-    filtered_df = filtered_df[filtered_df['Fascia_Edificio'] == building_class]
-if borough_choice:
-    filtered_df = filtered_df[filtered_df['Borough'] == borough_choice]
-filtered_df = filtered_df[filtered_df['Work Type'] == work_type]
+# Pre-sliced Duration / Permit Sequence arrays of the scenario in the period (None when no rows match)
+scenario = (building_class, borough_choice, work_type)
+segment = load_segment(index, scenario, period)
+
+# Simulated Duration and Permit Sequence histograms of the scenario (same seed -> same results)
+if segment is not None:
+    summary = scenario_summary(index, scenario, period, seed)
 
 st.subheader(" Durata Stimata + Permit Sequence")
 
-input_df = pd.DataFrame([{
+input_row = {
     "Work Type": work_type,
-    "Borough": borough_choice if borough_choice else "MANHATTAN",
-    "Fascia_Edificio": building_class if building_class else "EDIFICI 6-10 PIANI"
-}])
+    "Borough": borough_choice if borough_choice else DEFAULTS["Borough"],
+    "Fascia_Edificio": building_class if building_class else DEFAULTS["Fascia_Edificio"]
+}
 
 try:
-    encoded_input = encoder.transform(input_df)
-    predicted_duration = model_duration.predict(encoded_input)[0]
-    predicted_sequence = model_sequence.predict(encoded_input)[0]
+    prediction = predictions.get(tuple(input_row[col] for col in FEATURES))
+    if prediction is None:
+        # Combination outside the table: score it with the models
+        scored = score([input_row], load_models())
+        prediction = (scored["Predicted Duration"].iloc[0], scored["Predicted Permit Sequence"].iloc[0])
+    predicted_duration, predicted_sequence = prediction
     st.success(f"Durata stimata: {predicted_duration:.1f} giorni")
     st.info(f"Numero stimato di rilasci del permesso (Permit Sequence): {predicted_sequence}")
 except Exception as e:
@@ -64,44 +141,44 @@ except Exception as e:
 
 st.subheader(" Simulazione Monte Carlo - Durata")
 
-if not filtered_df.empty:
-    durations = filtered_df['Duration'].dropna()
-    mu, sigma = durations.mean(), durations.std()
-    simulated = np.random.normal(mu, sigma, 10000)
-    simulated = simulated[simulated > 0]
+if segment is not None:
+    mu = summary["mean"]
+
+    chart_start = time.perf_counter()
+    import matplotlib.pyplot as plt
+    report.setdefault("matplotlib", time.perf_counter() - chart_start)
 
+    # Drawn from the cached counts; the figure is closed as soon as Streamlit has its image
     fig, ax = plt.subplots()
-    ax.hist(simulated, bins=50, color='skyblue', edgecolor='black')
+    ax.hist(summary["edges"][:-1], bins=summary["edges"], weights=summary["counts"], color='skyblue', edgecolor='black')
     ax.axvline(mu, color='red', linestyle='--', label=f"Media: {mu:.1f} giorni")
-    ax.axvline(np.percentile(simulated, 5), color='orange', linestyle=':', label='5° percentile')
-    ax.axvline(np.percentile(simulated, 95), color='green', linestyle=':', label='95° percentile')
+    ax.axvline(summary["p5"], color='orange', linestyle=':', label='5° percentile')
+    ax.axvline(summary["p95"], color='green', linestyle=':', label='95° percentile')
     ax.set_title("Distribuzione durata simulata")
     ax.set_xlabel("Durata (giorni)")
     ax.set_ylabel("Frequenza")
     ax.legend()
     st.pyplot(fig)
+    plt.close(fig)
 
     st.info(f"Durata media simulata: {mu:.1f} giorni")
-    st.info(f"Intervallo 90% confidenza: {np.percentile(simulated, 5):.1f} - {np.percentile(simulated, 95):.1f} giorni")
+    st.info(f"Intervallo 90% confidenza: {summary['p5']:.1f} - {summary['p95']:.1f} giorni")
 else:
     st.warning("Non ci sono abbastanza dati per la simulazione della durata.")
 
 st.subheader(" Simulazione Monte Carlo su Permit Sequence")
 
-if not filtered_df.empty:
-    sequences = filtered_df['Permit Sequence'].dropna().astype(int)
-    sequence_counts = sequences.value_counts(normalize=True).sort_index()
-    simulated_sequence = np.random.choice(sequence_counts.index, size=10000, p=sequence_counts.values)
-
+if segment is not None:
     fig2, ax2 = plt.subplots()
-    ax2.hist(simulated_sequence, bins=np.arange(simulated_sequence.min(), simulated_sequence.max()+2)-0.5,
+    ax2.hist(summary["seq_edges"][:-1] + 0.5, bins=summary["seq_edges"], weights=summary["seq_counts"],
              color='lightgreen', edgecolor='black', rwidth=0.8)
     ax2.set_title("Distribuzione simulata dei rilasci del permesso")
     ax2.set_xlabel("Numero di rilasci (Permit Sequence)")
     ax2.set_ylabel("Frequenza")
     st.pyplot(fig2)
+    plt.close(fig2)
 
-    p_multiple = np.mean(simulated_sequence >= 2) * 100
+    p_multiple = summary["p_multiple"]
     st.info(f"Probabilità stimata di dover richiedere 2 o più rilasci: {p_multiple:.1f}%")
 else:
     st.warning("Non ci sono abbastanza dati per simulare la Permit Sequence.")
@@ -110,9 +187,29 @@ st.subheader(" Analisi Rinnovo Permesso (Soglia Personalizzata)")
 
 threshold = st.slider("Imposta la soglia durata massima prima di dover rinnovare il permesso (giorni):", 30, 365, 120, step=10)
 
-if not filtered_df.empty:
-    simulated_threshold_exceeded = simulated[simulated > threshold]
-    p_exceeded = len(simulated_threshold_exceeded) / len(simulated) * 100
+# Observed exceedance probabilities for every threshold, from the segment's sorted durations
+if segment is not None:
+    curve = exceedance_curve(segment)
+    p_exceeded = curve[threshold] * 100
     st.info(f"Probabilità stimata di superare la soglia di {threshold} giorni: {p_exceeded:.1f}%")
+    st.line_chart(pd.Series(curve, name="P(durata > soglia)").rename_axis("Soglia (giorni)"))
 else:
     st.warning("Dati insufficienti per stimare la probabilità di sforo soglia.")
+
+st.subheader(" Portafoglio di Progetti (Monte Carlo)")
+
+portfolio_file = st.file_uploader("Carica un CSV con le colonne Work Type, Borough, Fascia_Edificio:", type="csv")
+
+if portfolio_file is not None:
+    projects = pd.read_csv(portfolio_file)
+    try:
+        portfolio = simulate_portfolio(df, projects, seed=seed, index=index, period=period)
+        st.dataframe(portfolio)
+        st.info(f"Tempo di completamento del portafoglio (95° percentile): {portfolio.loc['p95', 'completion_days']:.1f} giorni")
+    except (KeyError, ValueError) as e:
+        st.error("Errore nella simulazione del portafoglio.")
+        st.exception(e)
+
+with st.expander("Tempi di avvio"):
+    st.table(pd.DataFrame({"secondi": pd.Series(report, dtype=float).round(3)}))
+    st.caption(f"Memoria del dataset: {memory_mb(df):.2f} MB")
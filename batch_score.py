@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# Model inputs and the values used when a row leaves Borough / Fascia_Edificio empty ("Totale")
+FEATURES = ["Work Type", "Borough", "Fascia_Edificio"]
+DEFAULTS = {"Borough": "MANHATTAN", "Fascia_Edificio": "EDIFICI 6-10 PIANI"}
+
+CHUNK_SIZE = 10_000
+
+
+# model_duration.pkl, model_sequence.pkl and encoder.pkl, loaded once.
+# mmap_mode="r" memory-maps the numpy arrays stored in the pickles instead of copying them.
+def load_models(model_dir=".", mmap_mode=None):
+    import joblib
+
+    model_duration = joblib.load(os.path.join(model_dir, "model_duration.pkl"), mmap_mode=mmap_mode)
+    model_sequence = joblib.load(os.path.join(model_dir, "model_sequence.pkl"), mmap_mode=mmap_mode)
+    encoder = joblib.load(os.path.join(model_dir, "encoder.pkl"), mmap_mode=mmap_mode)
+    return model_duration, model_sequence, encoder
+
+
+# Model input frame: the three features, with the tool's defaults for missing values
+def model_input(rows):
+    rows = pd.DataFrame(rows)
+    if "Work Type" not in rows.columns:
+        raise KeyError("missing input column: Work Type")
+    return rows.reindex(columns=FEATURES).fillna(DEFAULTS)
+
+
+# Predictions for a batch of rows: one encoder.transform and one predict per model
+def score(rows, models):
+    model_duration, model_sequence, encoder = models
+    encoded = encoder.transform(model_input(rows))
+    result = pd.DataFrame(rows).copy()
+    result["Predicted Duration"] = model_duration.predict(encoded)
+    result["Predicted Permit Sequence"] = model_sequence.predict(encoded)
+    return result
+
+
+# Chunks of a CSV or Parquet input file
+def iter_input(path, chunksize=CHUNK_SIZE):
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def _write_chunk(df, output_path, state):
+    if output_path.lower().endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if state.get("writer") is None:
+            state["writer"] = pq.ParquetWriter(output_path, table.schema)
+        state["writer"].write_table(table)
+    else:
+        df.to_csv(output_path, mode="w" if state.get("first", True) else "a",
+                  header=state.get("first", True), index=False)
+        state["first"] = False
+
+
+# Score a whole file chunk by chunk and return throughput / latency statistics
+def score_file(input_path, output_path, models, chunksize=CHUNK_SIZE):
+    latencies = []
+    rows = 0
+    state = {}
+    start = time.perf_counter()
+    try:
+        for chunk in iter_input(input_path, chunksize):
+            chunk_start = time.perf_counter()
+            scored = score(chunk, models)
+            latencies.append(time.perf_counter() - chunk_start)
+            _write_chunk(scored, output_path, state)
+            rows += len(chunk)
+    finally:
+        if state.get("writer") is not None:
+            state["writer"].close()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "rows": rows,
+        "batches": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else None,
+        "batch_latency_ms_p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "batch_latency_ms_p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "batch_latency_ms_max": round(float(latencies_ms.max()), 3),
+    }
+
+
+# Local HTTP endpoint: POST /score with a JSON list of rows (or {"rows": [...]})
+def make_handler(models):
+    class ScoreHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                rows = payload["rows"] if isinstance(payload, dict) else payload
+                start = time.perf_counter()
+                scored = score(rows, models)
+                latency_ms = (time.perf_counter() - start) * 1000
+            except (KeyError, TypeError, ValueError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            self._send(200, {
+                "predictions": json.loads(scored.to_json(orient="records")),
+                "latency_ms": round(latency_ms, 3),
+            })
+
+    return ScoreHandler
+
+
+def serve(models, host="127.0.0.1", port=8000):
+    server = ThreadingHTTPServer((host, port), make_handler(models))
+    print(f"Scoring on http://{host}:{port}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch predictions of Duration and Permit Sequence")
+    parser.add_argument("--models", default=".", help="folder with model_duration.pkl, model_sequence.pkl, encoder.pkl")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = commands.add_parser("score", help="score a CSV or Parquet file")
+    score_parser.add_argument("input")
+    score_parser.add_argument("output")
+    score_parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+
+    serve_parser = commands.add_parser("serve", help="start the local HTTP endpoint")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+
+    args = parser.parse_args()
+    models = load_models(args.models)
+    if args.command == "score":
+        stats = score_file(args.input, args.output, models, args.chunksize)
+        print(json.dumps(stats, indent=2))
+    else:
+        serve(models, args.host, args.port)
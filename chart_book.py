@@ -0,0 +1,254 @@
+import argparse
+import os
+
+from chart_render import DENSITY_MIN_POINTS, render_jobs, scatter_job
+from height_bands import LABELS
+from permit_cache import load_workbook
+from permit_cube import CUBE_COLUMNS, all_cube_rows, band_counts, group_cube, load_cube, mean_duration
+
+# Families drawn from individual rows rather than from the cube
+ROW_FAMILIES = {"scatter"}
+
+SUBTYPES = ["MH", "BL"]
+
+# Colors (light for boroughs, darker for NYC total)
+COLORS_BOROUGH = {"MH": "#87CEFA", "BL": "#FF9999"}
+COLORS_NYC = {"MH": "#1E90FF", "BL": "#B22222"}
+
+# Expected share (%) of each height band by borough
+EXPECTED = {
+    'Manhattan': {'3–5 floors': 47.0, '6–10 floors': 29.5, '11–15 floors': 6.0, '>15 floors': 17.5},
+    'Brooklyn': {'3–5 floors': 69.0, '6–10 floors': 23.0, '11–15 floors': 7.0, '>15 floors': 1.0},
+    'Queens': {'3–5 floors': 76.0, '6–10 floors': 19.0, '11–15 floors': 4.0, '>15 floors': 1.0},
+    'Bronx': {'3–5 floors': 59.0, '6–10 floors': 32.0, '11–15 floors': 7.0, '>15 floors': 2.0},
+    'Staten Island': {'3–5 floors': 89.0, '6–10 floors': 9.0, '11–15 floors': 2.0, '>15 floors': 0.0}
+}
+
+# The chart book. "rows" is "completed" (every row with a duration) or "cleaned";
+# "output" is a folder (a file for mean_duration), relative to the output folder of run_book.
+CHART_BOOK = [
+    {
+        "name": "duration_comparison",
+        "family": "comparison",
+        "rows": "cleaned",
+        "output": "duration_paragone_final",
+        "expected": EXPECTED,
+        "colors_borough": {"MH_obs": "#87CEFA", "BL_obs": "#FF9999", "Expected": "#90EE90"},
+        "colors_nyc": {"MH_obs": "#1E90FF", "BL_obs": "#B22222", "Expected": "#90EE90"},
+    },
+    {
+        "name": "permit_counts",
+        "family": "band_counts",
+        "rows": "cleaned",
+        "band": "Issuance Band",
+        "output": "Duration_Graphs",
+        "colors_borough": COLORS_BOROUGH,
+        "colors_nyc": COLORS_NYC,
+    },
+    {
+        "name": "mean_duration_completed",
+        "family": "mean_duration",
+        "rows": "completed",
+        "output": "unified_grouped_permit_duration.png",
+        "colors_borough": COLORS_BOROUGH,
+        "colors_nyc": COLORS_NYC,
+    },
+    {
+        "name": "mean_duration_cleaned",
+        "family": "mean_duration",
+        "rows": "cleaned",
+        "output": "unified_grouped_permit_duration_cleaned.png",
+        "colors_borough": COLORS_BOROUGH,
+        "colors_nyc": COLORS_NYC,
+    },
+    {
+        "name": "individual",
+        "family": "scatter",
+        "rows": "completed",
+        "output": "individual_scatter_plots",
+        "colors": COLORS_BOROUGH,
+        "xlim": (1980, 2027),
+        "ylim": (0, 4000),
+        "density_min_points": DENSITY_MIN_POINTS,
+    },
+]
+
+
+# A spec of the book by name, with some of its fields replaced
+def book_spec(name, **overrides):
+    spec = next((s for s in CHART_BOOK if s["name"] == name), None)
+    if spec is None:
+        raise KeyError(f"no chart spec named {name!r}")
+    return {**spec, **overrides}
+
+
+def _rows_of(table, spec):
+    return table[table["Cleaned"]] if spec["rows"] == "cleaned" else table
+
+
+def _output(output_dir, spec, *parts):
+    return os.path.join(output_dir, spec["output"], *parts)
+
+
+def _shares(cube, borough=None):
+    counts = band_counts(cube, borough, SUBTYPES)
+    shares = counts.div(counts.sum(axis=1), axis=0).fillna(0) * 100
+    return {f"{tipo}_obs": shares.loc[tipo, LABELS].tolist() for tipo in SUBTYPES}
+
+
+# Observed vs expected shares per height band, one figure per borough plus NYC
+def comparison_jobs(spec, cube, rows, output_dir):
+    cube = _rows_of(cube, spec)
+    expected = spec["expected"]
+    jobs = []
+    for sheet in cube["Borough"].unique():
+        borough = next((b for b in expected if b.lower() == sheet.lower()), None)
+        if borough is None:
+            continue
+        series = _shares(cube, sheet)
+        series["Expected"] = [expected[borough].get(label, 0) for label in LABELS]
+        jobs.append({
+            "kind": "comparison",
+            "path": _output(output_dir, spec, f"{borough.replace(' ', '_')}_grouped_comparison.png"),
+            "data": {
+                "title": f"{borough.upper()} – Observed vs Expected Permit Durations by Height",
+                "labels": LABELS,
+                "series": series,
+                "colors": spec["colors_borough"],
+            },
+        })
+
+    # NYC total, against the average expected values across boroughs
+    series = _shares(cube)
+    series["Expected"] = [sum(expected[b].get(label, 0) for b in expected) / len(expected) for label in LABELS]
+    jobs.append({
+        "kind": "comparison",
+        "path": _output(output_dir, spec, "NYC_grouped_comparison.png"),
+        "data": {
+            "title": "NYC TOTAL – Observed vs Expected Permit Durations by Height",
+            "labels": LABELS,
+            "series": series,
+            "colors": spec["colors_nyc"],
+        },
+    })
+    return jobs
+
+
+def _band_counts_job(cube, borough, band, title, colors, path):
+    counts = band_counts(cube, borough, SUBTYPES, band)
+    percentages = (counts.div(counts.sum(axis=1), axis=0) * 100).round(1)
+    return {
+        "kind": "band_counts",
+        "path": path,
+        "data": {
+            "title": title,
+            "labels": LABELS,
+            "counts": {subtype: counts.loc[subtype].tolist() for subtype in SUBTYPES},
+            "percentages": {subtype: percentages.loc[subtype].tolist() for subtype in SUBTYPES},
+            "colors": colors,
+        },
+    }
+
+
+# Number of permits per height band, one figure per borough plus NYC
+def band_count_jobs(spec, cube, rows, output_dir):
+    band = spec.get("band", "Band")
+    cube = _rows_of(cube, spec)
+    cube = cube[cube[band].notna()]
+    jobs = [_band_counts_job(cube, sheet, band, f"{sheet.upper()} – Permit Durations by Building Height",
+                             spec["colors_borough"],
+                             _output(output_dir, spec, "boroughs_grouped", f"{sheet}_grouped.png".replace(" ", "_")))
+            for sheet in cube["Borough"].unique()]
+    jobs.append(_band_counts_job(cube, None, band, "NYC Total – Permit Durations by Building Height",
+                                 spec["colors_nyc"], _output(output_dir, spec, "nyc_total_grouped", "NYC_grouped.png")))
+    return jobs
+
+
+# Mean duration per subtype, one bar group per borough plus NYC
+def mean_duration_jobs(spec, cube, rows, output_dir):
+    table = mean_duration(_rows_of(cube, spec), SUBTYPES)
+    return [{
+        "kind": "mean_duration",
+        "path": _output(output_dir, spec),
+        "data": {
+            "title": "Average Duration of MH / BL Permits by Borough and NYC Total",
+            "groups": [str(b) for b in table.columns],
+            "values": {subtype: table.loc[subtype].tolist() for subtype in SUBTYPES},
+            "colors_borough": spec["colors_borough"],
+            "colors_nyc": spec["colors_nyc"],
+        },
+    }]
+
+
+# Start year vs duration per borough and subtype (density raster for large sets)
+def scatter_jobs(spec, cube, rows, output_dir):
+    rows = _rows_of(rows, spec)
+    (x_min, x_max), (y_min, y_max) = spec["xlim"], spec["ylim"]
+    inside = (rows["Start Year"].between(x_min, x_max).fillna(False) & rows["Duration"].between(y_min, y_max))
+    rows = rows[inside.to_numpy(dtype=bool)]
+    jobs = []
+    for sheet in rows["Borough"].cat.categories:
+        for subtype in SUBTYPES:
+            points = rows[(rows["Borough"] == sheet) & (rows["Permit Subtype"] == subtype)]
+            if points.empty:
+                continue
+            filename = f"{sheet.upper()}_{subtype}_scatter.png".replace(" ", "_")
+            jobs.append(scatter_job(_output(output_dir, spec, filename), {
+                "title": f"{sheet.upper()} – {subtype} – Permit Durations",
+                "x": points["Start Year"].to_numpy(dtype=float),
+                "y": points["Duration"].to_numpy(),
+                "color": spec["colors"][subtype],
+                "xlim": (x_min, x_max),
+                "ylim": (y_min, y_max),
+                "xticks": list(range(x_min, x_max + 1, 5)),
+                "yticks": list(range(y_min, y_max + 1, 500)),
+            }, spec.get("density_min_points", DENSITY_MIN_POINTS)))
+    return jobs
+
+
+FAMILIES = {
+    "comparison": comparison_jobs,
+    "band_counts": band_count_jobs,
+    "mean_duration": mean_duration_jobs,
+    "scatter": scatter_jobs,
+}
+
+
+# Render the specs from a cube (permit_cube): every chart is a rollup of it, except the
+# ROW_FAMILIES, which need the cube rows. Figures whose data and styling are unchanged
+# since they were drawn are skipped (unless force).
+def render_cube(cube, specs=CHART_BOOK, output_dir=".", workers=None, report=True, force=False, rows=None):
+    jobs = [job for spec in specs for job in FAMILIES[spec["family"]](spec, cube, rows, output_dir)]
+    render_jobs(jobs, workers=workers, report=report, force=force)
+    return jobs
+
+
+# Render the specs from already loaded sheets: one reduction, one grouped pass, then rollups
+def render_book(sheets, specs=CHART_BOOK, output_dir=".", workers=None, report=True, force=False):
+    rows = all_cube_rows(sheets)
+    return render_cube(group_cube(rows), specs, output_dir, workers, report, force, rows)
+
+
+# The whole chart book (or the given specs) from the workbook's persisted cube; the workbook
+# itself is only read when a spec draws individual rows
+def run_book(input_path, specs=CHART_BOOK, output_dir=".", workers=None, report=True, force=False):
+    cube = load_cube(input_path)
+    rows = None
+    if any(spec["family"] in ROW_FAMILIES for spec in specs):
+        rows = all_cube_rows(load_workbook(input_path, columns=CUBE_COLUMNS))
+    return render_cube(cube, specs, output_dir, workers, report, force, rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the chart book from one workbook read")
+    parser.add_argument("input", nargs="?", default="PROJECT_completed.xlsx")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--only", nargs="+", choices=[s["name"] for s in CHART_BOOK],
+                        help="render only these specs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="redraw figures that are up to date")
+    args = parser.parse_args()
+
+    specs = [book_spec(name) for name in args.only] if args.only else CHART_BOOK
+    jobs = run_book(args.input, specs, args.output_dir, args.workers, force=args.force)
+    print(f"{len(jobs)} charts up to date in:", os.path.abspath(args.output_dir))
@@ -0,0 +1,314 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib.colors import LinearSegmentedColormap, LogNorm
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+
+from permit_trace import stage
+
+# Figure size of each chart family
+FIGSIZES = {
+    "comparison": (12, 6),
+    "mean_duration": (12, 6),
+    "band_counts": (10, 6),
+    "scatter": (8, 5),
+    "density": (8, 5),
+}
+
+# Scatter jobs with more points than this are drawn as a start year x duration density raster
+DENSITY_MIN_POINTS = 20_000
+# Raster cells: one year wide, DENSITY_Y_BIN days high
+DENSITY_Y_BIN = 25
+
+# Manifest kept in every output folder: {figure file: key of the job that drew it}
+CHART_MANIFEST = ".chart_manifest.json"
+# Part of every key: bump when a drawer changes so all figures are redrawn
+CHART_VERSION = 1
+
+# One figure per chart family and process, reused for every chart of that family
+_templates = {}
+
+
+def _template(kind):
+    if kind not in _templates:
+        fig = Figure(figsize=FIGSIZES[kind])
+        ax = fig.add_subplot()
+        _templates[kind] = {"fig": fig, "ax": ax, "artists": {}}
+    return _templates[kind]
+
+
+# Observed vs expected shares per height band (Duration / Expected vs Obtained)
+def draw_comparison(template, data):
+    ax = template["ax"]
+    ax.cla()
+    labels = data["labels"]
+    x = np.arange(len(labels))
+    width = 0.2
+    offsets = [-width, 0, width]
+
+    for offset, (key, vals) in zip(offsets, data["series"].items()):
+        bars = ax.bar(x + offset, vals, width=width,
+                      color=data["colors"][key], edgecolor="black",
+                      alpha=1 if key != "Expected" else 0.6,
+                      hatch="//" if key == "Expected" else "",
+                      label=key.replace("_", " ").upper())
+        for bar, val in zip(bars, vals):
+            if val > 0:
+                ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1,
+                        f"{val:.1f}%", ha="center", fontsize=9)
+
+    ax.set_title(data["title"])
+    ax.set_ylabel("Permit Share (%)")
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels)
+    ax.set_ylim(0, 100)
+    ax.grid(axis="y", linestyle="--", alpha=0.6)
+    ax.legend(ncol=3)
+
+
+# Average MH / BL duration per borough plus the NYC total (first / second graphs)
+def draw_mean_duration(template, data):
+    ax = template["ax"]
+    ax.cla()
+    groups = data["groups"]
+    x = np.arange(len(groups))
+    bar_width = 0.35
+
+    for idx, borough in enumerate(groups):
+        colors = data["colors_nyc"] if borough.upper() == "NYC" else data["colors_borough"]
+        for offset, subtype in zip([-bar_width / 2, bar_width / 2], ["MH", "BL"]):
+            ax.bar(idx + offset, data["values"][subtype][idx], width=bar_width,
+                   color=colors[subtype], edgecolor="black")
+
+    ax.set_xticks(x)
+    ax.set_xticklabels([b.upper() for b in groups], rotation=0)
+    ax.set_ylabel("Average Permit Duration (days)")
+    ax.set_title(data["title"])
+    ax.set_ylim(0, 600)
+    ax.grid(axis="y", linestyle="--", alpha=0.6)
+    ax.legend(handles=[
+        Patch(facecolor=data["colors_borough"]["MH"], edgecolor="black", label="MH (borough)"),
+        Patch(facecolor=data["colors_borough"]["BL"], edgecolor="black", label="BL (borough)"),
+        Patch(facecolor=data["colors_nyc"]["MH"], edgecolor="black", label="MH (NYC)"),
+        Patch(facecolor=data["colors_nyc"]["BL"], edgecolor="black", label="BL (NYC)"),
+    ], loc="upper right")
+
+
+# Number of permits per height band (Number of permits)
+def draw_band_counts(template, data):
+    ax = template["ax"]
+    ax.cla()
+    labels = data["labels"]
+    x = range(len(labels))
+    width = 0.35
+
+    for subtype, counts in data["counts"].items():
+        offset = -width/2 if subtype == "MH" else width/2
+        bars = ax.bar([pos + offset for pos in x], counts, width=width,
+                      color=data["colors"][subtype], edgecolor="black", label=subtype)
+        for bar, perc in zip(bars, data["percentages"][subtype]):
+            if bar.get_height() > 0:
+                ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1,
+                        f"{int(bar.get_height())} ({perc}%)", ha="center", fontsize=9)
+
+    ax.set_title(data["title"])
+    ax.set_xlabel("Building Height Category")
+    ax.set_ylabel("Number of Permits")
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels)
+    ax.legend(title="Permit Type")
+    ax.grid(axis="y", linestyle="--", alpha=0.6)
+    ax.set_ylim(0, None)
+
+
+# Start year vs duration (Individual); the axes and the scatter artist are reused
+def draw_scatter(template, data):
+    ax = template["ax"]
+    points = np.column_stack([data["x"], data["y"]])
+    scatter = template["artists"].get("scatter")
+
+    if scatter is None:
+        scatter = ax.scatter(points[:, 0], points[:, 1], color=data["color"],
+                             alpha=0.6, edgecolor="black", linewidth=0.3)
+        template["artists"]["scatter"] = scatter
+        ax.set_xlabel("Start Year")
+        ax.set_ylabel("Duration (days)")
+        ax.grid(True, linestyle="--", alpha=0.5)
+    else:
+        scatter.set_offsets(points)
+        scatter.set_facecolor(data["color"])
+
+    ax.set_title(data["title"])
+    ax.set_xlim(*data["xlim"])
+    ax.set_ylim(*data["ylim"])
+    ax.set_xticks(data["xticks"])
+    ax.set_yticks(data["yticks"])
+
+
+# Points per raster cell, in one bincount pass (x: integer years, y: days)
+def density_counts(x, y, xlim, ylim, y_bin=DENSITY_Y_BIN):
+    x_edges = np.arange(xlim[0], xlim[1] + 2) - 0.5
+    y_edges = np.arange(ylim[0], ylim[1] + y_bin, y_bin)
+    ix = np.rint(np.asarray(x, dtype=float) - xlim[0]).astype(np.int64)
+    iy = np.minimum((np.asarray(y, dtype=float) - ylim[0]) // y_bin, len(y_edges) - 2).astype(np.int64)
+    shape = (len(x_edges) - 1, len(y_edges) - 1)
+    inside = (ix >= 0) & (ix < shape[0]) & (iy >= 0)
+    counts = np.bincount(ix[inside] * shape[1] + iy[inside], minlength=shape[0] * shape[1])
+    return counts.reshape(shape), x_edges, y_edges
+
+
+# A scatter job, or a density job carrying only the binned counts when there are too many points
+def scatter_job(path, data, density_min_points=DENSITY_MIN_POINTS):
+    if len(data["x"]) <= density_min_points:
+        return {"kind": "scatter", "path": path, "data": data}
+
+    counts, x_edges, y_edges = density_counts(data["x"], data["y"], data["xlim"], data["ylim"])
+    density = {k: v for k, v in data.items() if k not in ("x", "y")}
+    density.update(counts=counts, x_edges=x_edges, y_edges=y_edges)
+    return {"kind": "density", "path": path, "data": density}
+
+
+# Start year x duration counts as an image: the cost depends on the cells, not the points
+def draw_density(template, data):
+    ax = template["ax"]
+    counts = np.ma.masked_equal(data["counts"].T, 0)
+    extent = (data["x_edges"][0], data["x_edges"][-1], data["y_edges"][0], data["y_edges"][-1])
+    cmap = LinearSegmentedColormap.from_list("density", [data["color"], "black"])
+    norm = LogNorm(vmin=1, vmax=max(int(counts.max() or 1), 2))
+    image = template["artists"].get("image")
+
+    if image is None:
+        image = ax.imshow(counts, origin="lower", aspect="auto", interpolation="nearest",
+                          extent=extent, cmap=cmap, norm=norm)
+        template["artists"]["image"] = image
+        template["artists"]["colorbar"] = template["fig"].colorbar(image, ax=ax, label="Permits per cell")
+        ax.set_xlabel("Start Year")
+        ax.set_ylabel("Duration (days)")
+        ax.grid(True, linestyle="--", alpha=0.5)
+    else:
+        image.set_data(counts)
+        image.set_extent(extent)
+        image.set_cmap(cmap)
+        image.set_norm(norm)
+        template["artists"]["colorbar"].update_normal(image)
+
+    ax.set_title(data["title"])
+    ax.set_xlim(*data["xlim"])
+    ax.set_ylim(*data["ylim"])
+    ax.set_xticks(data["xticks"])
+    ax.set_yticks(data["yticks"])
+
+
+DRAWERS = {
+    "comparison": draw_comparison,
+    "band_counts": draw_band_counts,
+    "mean_duration": draw_mean_duration,
+    "scatter": draw_scatter,
+    "density": draw_density,
+}
+
+
+# Render one job {"kind", "path", "data"}; returns (path, seconds)
+def render(job):
+    start = time.perf_counter()
+    figure = os.path.basename(job["path"])
+    with stage("draw", figure):
+        template = _template(job["kind"])
+        DRAWERS[job["kind"]](template, job["data"])
+        template["fig"].tight_layout()
+    with stage("savefig", figure):
+        os.makedirs(os.path.dirname(os.path.abspath(job["path"])), exist_ok=True)
+        template["fig"].savefig(job["path"])
+    return job["path"], time.perf_counter() - start
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value)
+        return {"dtype": str(data.dtype), "shape": data.shape, "sha256": hashlib.sha256(data.tobytes()).hexdigest()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"cannot hash {type(value).__name__} in chart data")
+
+
+# Content key of a job: its family, figure size and data (aggregates and styling), not its path
+def job_key(job):
+    spec = {"version": CHART_VERSION, "kind": job["kind"], "figsize": FIGSIZES[job["kind"]], "data": job["data"]}
+    return hashlib.sha256(json.dumps(spec, default=_encode).encode("utf-8")).hexdigest()
+
+
+def _manifest_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CHART_MANIFEST)
+
+
+def _read_chart_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Jobs whose figure is missing or was drawn from other data, with the key of each
+def stale_jobs(jobs):
+    manifests = {}
+    stale = []
+    for job in jobs:
+        manifest_path = _manifest_path(job["path"])
+        if manifest_path not in manifests:
+            manifests[manifest_path] = _read_chart_manifest(manifest_path)
+        key = job_key(job)
+        name = os.path.basename(job["path"])
+        if manifests[manifest_path].get(name) != key or not os.path.exists(job["path"]):
+            stale.append((job, key))
+    return stale
+
+
+def _record_keys(rendered):
+    by_manifest = {}
+    for job, key in rendered:
+        by_manifest.setdefault(_manifest_path(job["path"]), {})[os.path.basename(job["path"])] = key
+    for manifest_path, keys in by_manifest.items():
+        manifest = _read_chart_manifest(manifest_path)
+        manifest.update(keys)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+# Render the jobs whose figure is out of date (all of them with force=True), in worker
+# processes when workers > 1, and print the time of each figure
+def render_jobs(jobs, workers=1, report=True, force=False):
+    # The last job for a path wins, as it would when overwriting
+    jobs = list({os.path.abspath(job["path"]): job for job in jobs}.values())
+    stale = [(job, job_key(job)) for job in jobs] if force else stale_jobs(jobs)
+    skipped = len(jobs) - len(stale)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(stale)))
+
+    # Jobs of the same family go to the same worker so its template is reused
+    stale = sorted(stale, key=lambda item: item[0]["kind"])
+    todo = [job for job, _ in stale]
+    start = time.perf_counter()
+    if workers == 1:
+        timings = [render(job) for job in todo]
+    else:
+        chunksize = max(1, len(todo) // workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            timings = list(pool.map(render, todo, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    _record_keys(stale)
+
+    if report:
+        for path, seconds in timings:
+            print(f"{seconds:8.3f}s  {path}")
+        print(f"{len(timings)} figures rendered in {elapsed:.2f}s with {workers} worker(s), "
+              f"{skipped} unchanged")
+    return timings
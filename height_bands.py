@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# Building height bands
+LABELS = ["3–5 floors", "6–10 floors", "11–15 floors", ">15 floors"]
+
+# Upper duration limit (days, inclusive) of each band except the last, per permit subtype
+BANDS = {
+    "BL": [60, 120, 179],
+    "MH": [120, 180, 269],
+}
+
+
+# Band codes (0..3, -1 for missing durations) for an array of durations
+def band_codes(durations, subtype):
+    values = np.asarray(durations, dtype=float)
+    codes = np.searchsorted(BANDS[subtype], values, side="left")
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+# Classify a Duration column for one subtype; durations up to the first limit
+# (including 0) fall in the first band
+def classify(durations, subtype):
+    codes = band_codes(durations, subtype)
+    categories = pd.Categorical.from_codes(codes, categories=LABELS, ordered=True)
+    if isinstance(durations, pd.Series):
+        return pd.Series(categories, index=durations.index, name="Category")
+    return categories
+
+
+# Classify a frame with mixed subtypes; rows of other subtypes get NaN
+def classify_frame(df, duration_col="Duration", subtype_col="Permit Subtype"):
+    codes = np.full(len(df), -1, dtype=np.int64)
+    subtypes = df[subtype_col].to_numpy()
+    durations = df[duration_col].to_numpy(dtype=float)
+    for subtype in BANDS:
+        mask = subtypes == subtype
+        codes[mask] = band_codes(durations[mask], subtype)
+    categories = pd.Categorical.from_codes(codes, categories=LABELS, ordered=True)
+    return pd.Series(categories, index=df.index, name="Category")
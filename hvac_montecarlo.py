@@ -0,0 +1,164 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scenario_index import DATE_COLUMN, VALUE_COLUMNS, lookup
+
+# Columns describing one HVAC project
+PROJECT_COLUMNS = ["Work Type", "Borough", "Fascia_Edificio"]
+
+N_SAMPLES = 10_000
+PERCENTILES = (5, 50, 95)
+# Bins of the tool's simulated duration histogram
+HIST_BINS = 50
+
+
+# Rows of the dataset matching one project; a missing Borough/Fascia_Edificio matches all.
+# period = (start, end) keeps the rows whose DATE_COLUMN falls in it (whole days, None: open)
+def segment(df, project, period=None):
+    mask = np.ones(len(df), dtype=bool)
+    for col in PROJECT_COLUMNS:
+        value = project.get(col)
+        if value is not None and not pd.isna(value):
+            mask &= (df[col] == value).to_numpy()
+    if period is not None:
+        start, end = period
+        dates = df[DATE_COLUMN].dt.normalize()
+        if start is not None:
+            mask &= (dates >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (dates <= pd.Timestamp(end)).to_numpy()
+    return df[mask]
+
+
+# Duration and Permit Sequence arrays of every project, from the scenario index when given
+def project_samples(df, projects, index=None, period=None):
+    projects = pd.DataFrame(projects).reindex(columns=PROJECT_COLUMNS)
+    durations, sequences = [], []
+    for i, project in enumerate(projects.to_dict("records")):
+        project = {k: (None if pd.isna(v) else v) for k, v in project.items()}
+        if index is not None:
+            found = lookup(index, project["Fascia_Edificio"], project["Borough"], project["Work Type"],
+                           *(period or (None, None)))
+        else:
+            rows = segment(df, project, period)
+            found = None if rows.empty else {col: rows[col].to_numpy() for col in VALUE_COLUMNS}
+        if found is None:
+            raise ValueError(f"no data for project {i}: {project}")
+        durations.append(found["Duration"])
+        sequences.append(found["Permit Sequence"])
+    return durations, sequences
+
+
+# Per-project distribution parameters: duration mean/std and Permit Sequence pmf as a padded CDF
+def params_from_samples(durations, sequences):
+    mu = np.array([np.mean(d) for d in durations], dtype=float)
+    sigma = np.array([np.std(d, ddof=1) if len(d) > 1 else 0.0 for d in durations], dtype=float)
+
+    seq_values, seq_probs = [], []
+    for seq in sequences:
+        values, counts = np.unique(np.asarray(seq, dtype=np.int64), return_counts=True)
+        seq_values.append(values)
+        seq_probs.append(counts / counts.sum())
+
+    width = max(len(v) for v in seq_values)
+    values = np.zeros((len(seq_values), width), dtype=np.int64)
+    cdf = np.ones((len(seq_values), width))
+    for i, (v, p) in enumerate(zip(seq_values, seq_probs)):
+        values[i, :len(v)] = v
+        values[i, len(v):] = v[-1]
+        cdf[i, :len(p)] = np.cumsum(p)
+    cdf[:, -1] = 1.0
+
+    return {"mu": mu, "sigma": np.nan_to_num(sigma), "seq_values": values, "seq_cdf": cdf}
+
+
+def project_params(df, projects, index=None, period=None):
+    return params_from_samples(*project_samples(df, projects, index, period))
+
+
+# Normal durations conditioned on being positive (non-positive draws are redrawn)
+def sample_durations(mu, sigma, n_samples, rng):
+    mu = np.atleast_1d(mu).astype(float)
+    sigma = np.atleast_1d(sigma).astype(float)
+    draws = rng.normal(mu, sigma, size=(n_samples, len(mu)))
+    for _ in range(100):
+        bad = draws <= 0
+        if not bad.any():
+            break
+        draws[bad] = rng.normal(np.broadcast_to(mu, draws.shape)[bad], np.broadcast_to(sigma, draws.shape)[bad])
+    return np.where(draws > 0, draws, np.nan)
+
+
+# Permit Sequence draws for every project with one searchsorted over the stacked CDFs
+def sample_sequences(values, cdf, n_samples, rng):
+    n_projects, width = cdf.shape
+    offsets = np.arange(n_projects)
+    u = rng.random((n_samples, n_projects))
+    flat = (cdf + offsets[:, None]).ravel()
+    idx = np.searchsorted(flat, u + offsets, side="right")
+    idx = np.minimum(idx - offsets * width, width - 1)
+    return values[offsets, idx]
+
+
+def _simulate_chunk(params, n_samples, seed_seq):
+    rng = np.random.default_rng(seed_seq)
+    durations = sample_durations(params["mu"], params["sigma"], n_samples, rng)
+    sequences = sample_sequences(params["seq_values"], params["seq_cdf"], n_samples, rng)
+    return durations, sequences
+
+
+# (samples x projects) durations and sequences; each worker draws from its own spawned RNG stream
+def simulate(params, n_samples=N_SAMPLES, seed=None, workers=1):
+    workers = max(1, min(workers, n_samples))
+    streams = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [len(chunk) for chunk in np.array_split(np.arange(n_samples), workers)]
+    if workers == 1:
+        return _simulate_chunk(params, n_samples, streams[0])
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = list(pool.map(_simulate_chunk, [params] * workers, sizes, streams))
+    return (np.concatenate([d for d, _ in chunks]), np.concatenate([s for _, s in chunks]))
+
+
+# What the tool draws for one scenario: histogram counts/edges of the simulated durations and
+# Permit Sequences (one bin per value), the 5th/95th duration percentiles and P(sequence >= 2)
+def simulation_summary(segment, n_samples=N_SAMPLES, seed=None, bins=HIST_BINS):
+    params = params_from_samples([segment["Duration"]], [segment["Permit Sequence"]])
+    durations, sequences = simulate(params, n_samples, seed=seed)
+    durations, sequences = durations[:, 0], sequences[:, 0]
+    # Draws still not positive after the redraws are NaN (e.g. a segment of zero durations)
+    durations = durations[~np.isnan(durations)]
+
+    counts, edges = np.histogram(durations, bins=bins)
+    seq_edges = np.arange(sequences.min(), sequences.max() + 2) - 0.5
+    seq_counts, _ = np.histogram(sequences, bins=seq_edges)
+    p5, p95 = np.percentile(durations, [5, 95]) if len(durations) else (np.nan, np.nan)
+    return {
+        "mean": float(np.mean(segment["Duration"])),
+        "counts": counts,
+        "edges": edges,
+        "p5": float(p5),
+        "p95": float(p95),
+        "seq_counts": seq_counts,
+        "seq_edges": seq_edges,
+        "p_multiple": float(np.mean(sequences >= 2) * 100),
+    }
+
+
+# Portfolio percentiles: completion time when all projects start together (slowest project),
+# total project-days, and renewals (Permit Sequence - 1) summed over the portfolio
+def simulate_portfolio(df, projects, n_samples=N_SAMPLES, seed=None, workers=1, percentiles=PERCENTILES,
+                       index=None, period=None):
+    params = project_params(df, projects, index, period)
+    durations, sequences = simulate(params, n_samples, seed, workers)
+    completion = np.nanmax(durations, axis=1)
+    total_days = np.nansum(durations, axis=1)
+    renewals = (sequences - 1).sum(axis=1)
+
+    return pd.DataFrame({
+        "completion_days": np.percentile(completion, percentiles),
+        "total_project_days": np.percentile(total_days, percentiles),
+        "renewals": np.percentile(renewals, percentiles),
+    }, index=pd.Index([f"p{p}" for p in percentiles], name="percentile"))
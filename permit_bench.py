@@ -0,0 +1,210 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from functools import partial
+
+import pandas as pd
+
+from permit_synth import SHEETS, XLSX_MAX_ROWS, sheet_rows, write_synthetic
+from permit_trace import peak_rss_mb
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Stages timed on every size, in order; snapshot only applies to xlsx inputs
+STAGES = ["generate", "snapshot", "pipeline", "cube", "charts"]
+
+SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_FILE = "bench_results.jsonl"
+WORK_DIR = "bench_work"
+
+
+def code_version():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# xlsx while every sheet fits in a worksheet, csv above
+def input_format(n_rows, fmt="auto"):
+    if fmt != "auto":
+        return fmt
+    return "xlsx" if max(sheet_rows(n_rows).values()) < XLSX_MAX_ROWS else "csv"
+
+
+def input_path(work_dir, fmt):
+    return os.path.join(work_dir, "PROJECT_base.xlsx" if fmt == "xlsx" else f"PROJECT_base_{fmt}")
+
+
+# Sheets of the synthetic input, read the way the pipeline reads them
+def load_input(work_dir, fmt, workers):
+    path = input_path(work_dir, fmt)
+    if fmt == "xlsx":
+        from permit_cache import load_workbook
+        return load_workbook(path, workers=workers)
+    if fmt == "csv":
+        from permit_stream import stream_selected
+        sheets = {}
+        for sheet in SHEETS:
+            sheets.update(stream_selected(os.path.join(path, f"{sheet}.csv")))
+        return sheets
+    import pyarrow.parquet as pq
+    from permit_pipeline import DOWNSTREAM_COLUMNS
+
+    # Only the downstream columns the files have (e.g. Borough is the sheet, not a column)
+    sheets = {}
+    for sheet in SHEETS:
+        file = os.path.join(path, f"{sheet}.parquet")
+        names = pq.read_schema(file).names
+        sheets[sheet] = pd.read_parquet(file, columns=[c for c in DOWNSTREAM_COLUMNS if c in names])
+    return sheets
+
+
+def _cleaned_sheets(work_dir):
+    paths = {os.path.splitext(os.path.basename(p))[0]: p
+             for p in glob.glob(os.path.join(work_dir, "cleaned", "*.parquet"))}
+    return {sheet: pd.read_parquet(paths[sheet]) for sheet in SHEETS if sheet in paths}
+
+
+# Stages: each returns the number of rows it processed
+def stage_generate(work_dir, n_rows, fmt, seed, workers):
+    write_synthetic(input_path(work_dir, fmt), n_rows, seed, fmt)
+    return n_rows
+
+
+def stage_snapshot(work_dir, n_rows, fmt, seed, workers):
+    from permit_cache import build_cache
+    build_cache(input_path(work_dir, fmt), workers=workers)
+    return n_rows
+
+
+def stage_pipeline(work_dir, n_rows, fmt, seed, workers):
+    from permit_cache import map_sheets, typed_columns
+    from permit_pipeline import process_sheet
+
+    sheets = load_input(work_dir, fmt, workers)
+    processed = map_sheets(partial(process_sheet, intermediates=False), sheets, workers)
+    os.makedirs(os.path.join(work_dir, "cleaned"), exist_ok=True)
+    for sheet, (_, _, cleaned) in processed.items():
+        if cleaned is not None:
+            typed_columns(cleaned).to_parquet(os.path.join(work_dir, "cleaned", f"{sheet}.parquet"), index=False)
+    return n_rows
+
+
+def stage_cube(work_dir, n_rows, fmt, seed, workers):
+    from permit_cube import build_cube
+
+    sheets = _cleaned_sheets(work_dir)
+    build_cube(sheets).to_parquet(os.path.join(work_dir, "cube.parquet"), index=False)
+    return sum(len(df) for df in sheets.values())
+
+
+# The whole chart book from the cleaned sheets: one grouped pass, then every figure
+def stage_charts(work_dir, n_rows, fmt, seed, workers):
+    from chart_book import CHART_BOOK, render_book
+
+    sheets = _cleaned_sheets(work_dir)
+    render_book(sheets, CHART_BOOK, os.path.join(work_dir, "charts"), workers=workers, report=False,
+                force=True)
+    return sum(len(df) for df in sheets.values())
+
+
+STAGE_FUNCTIONS = {
+    "generate": stage_generate,
+    "snapshot": stage_snapshot,
+    "pipeline": stage_pipeline,
+    "cube": stage_cube,
+    "charts": stage_charts,
+}
+
+
+# Run one stage in a fresh process so its peak memory is its own
+def run_stage(stage, work_dir, n_rows, fmt, seed, workers):
+    command = [sys.executable, os.path.abspath(__file__), "--stage", stage, "--work-dir", work_dir,
+               "--rows", str(n_rows), "--format", fmt, "--seed", str(seed), "--workers", str(workers)]
+    result = subprocess.run(command, cwd=work_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"stage {stage} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes=SIZES, fmt="auto", work_dir=WORK_DIR, results_path=RESULTS_FILE, seed=0, workers=1):
+    version = code_version()
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    records = []
+    for n_rows in sizes:
+        size_fmt = input_format(n_rows, fmt)
+        size_dir = os.path.abspath(os.path.join(work_dir, f"{n_rows}_{size_fmt}"))
+        os.makedirs(size_dir, exist_ok=True)
+        for stage in STAGES:
+            if stage == "snapshot" and size_fmt != "xlsx":
+                continue
+            measured = run_stage(stage, size_dir, n_rows, size_fmt, seed, workers)
+            record = {
+                "version": version,
+                "timestamp": timestamp,
+                "rows": n_rows,
+                "format": size_fmt,
+                "workers": workers,
+                "stage": stage,
+                "stage_rows": measured["rows"],
+                "seconds": round(measured["seconds"], 4),
+                "rows_per_second": round(measured["rows"] / measured["seconds"], 1) if measured["seconds"] > 0 else None,
+                "peak_rss_mb": None if measured["peak_rss_mb"] is None else round(measured["peak_rss_mb"], 1),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+            }
+            records.append(record)
+            print(f"{n_rows:>12,} {stage:<9} {record['seconds']:>9.3f}s {record['peak_rss_mb']} MB")
+
+    with open(results_path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return pd.DataFrame(records)
+
+
+# This run next to the latest stored run of another version (ratio > 1: slower now)
+def compare(current, results_path=RESULTS_FILE):
+    history = pd.read_json(results_path, lines=True)
+    keys = ["rows", "format", "workers", "stage"]
+    previous = history[history["version"] != current["version"].iloc[0]]
+    if previous.empty:
+        return None
+    previous = previous.sort_values("timestamp").groupby(keys).tail(1)
+    merged = current.merge(previous[keys + ["version", "seconds", "peak_rss_mb"]], on=keys,
+                           suffixes=("", "_previous"))
+    merged["time_ratio"] = (merged["seconds"] / merged["seconds_previous"]).round(2)
+    merged["memory_ratio"] = (merged["peak_rss_mb"] / merged["peak_rss_mb_previous"]).round(2)
+    return merged[keys + ["version_previous", "seconds_previous", "seconds", "time_ratio",
+                          "peak_rss_mb_previous", "peak_rss_mb", "memory_ratio"]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the permit pipeline on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="total input rows of each run")
+    parser.add_argument("--format", choices=["auto", "xlsx", "csv", "parquet"], default="auto",
+                        help="input format (auto: xlsx while the sheets fit, csv above)")
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSON lines file the results are appended to")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        start = time.perf_counter()
+        rows = STAGE_FUNCTIONS[args.stage](args.work_dir, args.rows[0], args.format, args.seed, args.workers)
+        print(json.dumps({"rows": rows, "seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}))
+    else:
+        current = run_benchmark(args.rows, args.format, args.work_dir, args.results, args.seed, args.workers)
+        comparison = compare(current, args.results)
+        if comparison is not None:
+            print(comparison.to_string(index=False))
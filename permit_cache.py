@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+
+from permit_dates import parse_date_columns
+from permit_schema import compact_frame, memory_mb, memory_report
+from permit_trace import stage
+
+# Cache folder (created next to each source workbook)
+CACHE_DIR_NAME = ".permit_cache"
+MANIFEST_NAME = "manifest.json"
+
+# Bumped when the stored column types change
+CACHE_VERSION = 3
+
+
+# SHA-256 of the source workbook, read in blocks
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Folder holding the Parquet files of one workbook
+def cache_dir_for(path):
+    folder = os.path.dirname(os.path.abspath(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(folder, CACHE_DIR_NAME, stem)
+
+
+def sheet_file(sheet):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", sheet) + ".parquet"
+
+
+# Date columns are parsed once here; mixed object columns become numeric when
+# possible, otherwise strings (e.g. Zip Code); then the compact schema of permit_schema
+def typed_columns(df):
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    parse_date_columns(df)
+    for col in df.columns:
+        if df[col].dtype == object:
+            kind = pd.api.types.infer_dtype(df[col], skipna=True)
+            if kind in ("string", "empty", "boolean"):
+                continue
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return compact_frame(df)
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache_dir, manifest):
+    tmp_path = os.path.join(cache_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST_NAME))
+
+
+# Cache is valid if the mtime matches, or if the mtime changed but the content did not
+def _is_fresh(path, cache_dir, manifest):
+    if manifest is None or manifest.get("version") != CACHE_VERSION:
+        return False
+    if not all(os.path.exists(os.path.join(cache_dir, f)) for f in manifest["files"].values()):
+        return False
+    mtime = os.path.getmtime(path)
+    if manifest["mtime"] == mtime:
+        return True
+    if manifest["sha256"] == file_hash(path):
+        manifest["mtime"] = mtime
+        _write_manifest(cache_dir, manifest)
+        return True
+    return False
+
+
+# Number of worker processes: all cores, but never more than the sheets
+def worker_count(workers, n_sheets):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, n_sheets))
+
+
+# Apply func to every sheet, in a process pool when workers > 1.
+# The result keeps the workbook sheet order. On Windows the calling script
+# needs an `if __name__ == "__main__":` guard to use more than one worker.
+def map_sheets(func, sheets, workers=1):
+    names = list(sheets)
+    workers = worker_count(workers, len(names))
+    if workers == 1:
+        return {name: _traced_call(func, name, sheets[name]) for name in names}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(names, pool.map(_traced_call, repeat(func), names, [sheets[name] for name in names])))
+
+
+# func(df) as a traced stage named after func, with the sheet name for the stages it opens
+def _traced_call(func, sheet, df):
+    name = getattr(func, "func", func).__name__
+    with stage(name, sheet, rows_in=df) as record:
+        result = func(df)
+        record["rows_out"] = result
+    return result
+
+
+# One sheet: Excel -> typed DataFrame -> Parquet (runs inside worker processes)
+def _convert_sheet(path, sheet, parquet_path):
+    with stage("excel_parse", sheet) as record:
+        raw = pd.read_excel(path, sheet_name=sheet)
+        raw_mb = memory_mb(raw)
+        df = typed_columns(raw)
+        record["rows_out"] = df
+    with stage("parquet_write", sheet, rows_in=df):
+        df.to_parquet(parquet_path, index=False)
+    return df, raw_mb
+
+
+# SHA-256 of the source, taken from the manifest when the cache is fresh (only a stat call)
+def source_hash(path, cache_dir=None):
+    cache_dir = cache_dir or cache_dir_for(path)
+    manifest = _read_manifest(cache_dir)
+    if _is_fresh(path, cache_dir, manifest):
+        return manifest["sha256"]
+    return file_hash(path)
+
+
+# Parse the workbook with openpyxl and write one Parquet file per sheet
+def build_cache(path, cache_dir=None, workers=1):
+    cache_dir = cache_dir or cache_dir_for(path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    mtime = os.path.getmtime(path)
+    sha256 = file_hash(path)
+    xls = pd.ExcelFile(path)
+    sheet_names = xls.sheet_names
+    files = {sheet: sheet_file(sheet) for sheet in sheet_names}
+    parquet_paths = [os.path.join(cache_dir, files[sheet]) for sheet in sheet_names]
+
+    workers = worker_count(workers, len(sheet_names))
+    if workers == 1:
+        converted = []
+        for sheet, parquet_path in zip(sheet_names, parquet_paths):
+            with stage("excel_parse", sheet) as record:
+                raw = xls.parse(sheet)
+                raw_mb = memory_mb(raw)
+                df = typed_columns(raw)
+                record["rows_out"] = df
+            with stage("parquet_write", sheet, rows_in=df):
+                df.to_parquet(parquet_path, index=False)
+            converted.append((df, raw_mb))
+    else:
+        xls.close()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            converted = list(pool.map(_convert_sheet, repeat(path), sheet_names, parquet_paths))
+
+    sheets = {sheet: df for sheet, (df, _) in zip(sheet_names, converted)}
+    # Memory of each sheet as parsed from Excel and after the compact schema
+    sheet_memory = {sheet: [raw_mb, memory_mb(df)] for sheet, (df, raw_mb) in zip(sheet_names, converted)}
+    sheet_columns = {sheet: [str(c) for c in df.columns] for sheet, df in sheets.items()}
+
+    _write_manifest(cache_dir, {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "mtime": mtime,
+        "sha256": sha256,
+        "sheets": sheet_names,
+        "files": files,
+        "columns": sheet_columns,
+        "memory_mb": sheet_memory,
+    })
+    return sheets
+
+
+def _select(sheets, columns):
+    if columns is None:
+        return sheets
+    return {s: df[[c for c in columns if c in df.columns]] for s, df in sheets.items()}
+
+
+# Return {sheet name: DataFrame} in workbook order, reading Parquet when the cache is warm
+def load_workbook(path, columns=None, cache_dir=None, workers=1):
+    cache_dir = cache_dir or cache_dir_for(path)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        xls = pd.ExcelFile(path)
+        sheets = {}
+        for sheet in xls.sheet_names:
+            with stage("excel_parse", sheet) as record:
+                sheets[sheet] = parse_date_columns(xls.parse(sheet))
+                record["rows_out"] = sheets[sheet]
+        return _select(sheets, columns)
+
+    manifest = _read_manifest(cache_dir)
+    if not _is_fresh(path, cache_dir, manifest):
+        sheets = build_cache(path, cache_dir, workers)
+        return _select(sheets, columns)
+
+    sheets = {}
+    for sheet in manifest["sheets"]:
+        file_path = os.path.join(cache_dir, manifest["files"][sheet])
+        wanted = None
+        if columns is not None:
+            wanted = [c for c in columns if c in manifest["columns"][sheet]]
+        with stage("snapshot_read", sheet) as record:
+            sheets[sheet] = pd.read_parquet(file_path, columns=wanted)
+            record["rows_out"] = sheets[sheet]
+    return sheets
+
+
+# {sheet name: Parquet file} of the snapshot, built first when missing or stale
+def snapshot_files(path, cache_dir=None, workers=1):
+    cache_dir = cache_dir or cache_dir_for(path)
+    manifest = _read_manifest(cache_dir)
+    if not _is_fresh(path, cache_dir, manifest):
+        build_cache(path, cache_dir, workers)
+        manifest = _read_manifest(cache_dir)
+    return {sheet: os.path.join(cache_dir, manifest["files"][sheet]) for sheet in manifest["sheets"]}
+
+
+# NYC total: all borough sheets stacked
+def load_nyc(sheets):
+    return pd.concat(list(sheets.values()), ignore_index=True)
+
+
+# Per-borough frames (parsed and optionally pre-processed in parallel) plus the NYC frame
+def load_boroughs(path, preprocess=None, workers=None, columns=None):
+    sheets = load_workbook(path, columns=columns, workers=workers)
+    if preprocess is not None:
+        sheets = map_sheets(preprocess, sheets, workers)
+    return sheets, load_nyc(sheets)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prebuild the Parquet snapshots of Excel workbooks")
+    parser.add_argument("workbooks", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    for workbook in args.workbooks:
+        load_workbook(workbook, workers=args.workers)
+        print("Snapshot ready:", cache_dir_for(workbook))
+        print(memory_report(_read_manifest(cache_dir_for(workbook))["memory_mb"]).to_string())
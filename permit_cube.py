@@ -0,0 +1,160 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from height_bands import LABELS, classify_frame
+from permit_cache import cache_dir_for, load_workbook, source_hash
+from permit_dates import parse_dates
+from permit_pipeline import duration_cap_mask
+from permit_trace import stage
+
+# Dimensions of the cube. "Cleaned" marks rows within the subtype's duration limit (the rows
+# of PROJECT_cleaned.xlsx); "Issuance Band" classifies Expiration - Issuance Date.
+DIMS = ["Borough", "Permit Subtype", "Cleaned", "Band", "Issuance Band", "Start Year"]
+
+# Columns the cube is built from
+CUBE_COLUMNS = ["Permit Subtype", "Duration", "Job Start Date", "Issuance Date", "Expiration Date"]
+
+# Bump when the cube's layout changes, so persisted cubes are rebuilt
+CUBE_VERSION = 2
+
+# Duration histogram: 25-day bins from 0 to 4000 days, the last bin holds everything above
+HIST_BIN_DAYS = 25
+HIST_MAX_DAYS = 4000
+HIST_EDGES = np.arange(0, HIST_MAX_DAYS + HIST_BIN_DAYS, HIST_BIN_DAYS)
+HIST_COLUMNS = [f"h{i}" for i in range(len(HIST_EDGES))]
+
+MEASURES = ["count", "sum", "sumsq"] + HIST_COLUMNS
+
+
+# Histogram bin of each duration (negative durations go to the first bin)
+def hist_bins(durations):
+    values = np.clip(np.asarray(durations, dtype=float), 0, None)
+    return np.searchsorted(HIST_EDGES, values, side="right") - 1
+
+
+# Rows of one sheet reduced to the cube dimensions plus Duration.
+# With duration_from, Duration is recomputed as Expiration Date - that column.
+def cube_rows(df, borough, duration_from=None):
+    rows = pd.DataFrame(index=df.index)
+    rows["Borough"] = borough
+    rows["Permit Subtype"] = df["Permit Subtype"].str.strip()
+    if duration_from is None:
+        rows["Duration"] = df["Duration"].astype(float)
+    else:
+        rows["Duration"] = (parse_dates(df["Expiration Date"]) - parse_dates(df[duration_from])).dt.days
+    if "Issuance Date" in df.columns and "Expiration Date" in df.columns:
+        rows["Issuance Duration"] = (parse_dates(df["Expiration Date"]) - parse_dates(df["Issuance Date"])).dt.days
+    else:
+        rows["Issuance Duration"] = float("nan")
+    rows = rows.dropna(subset=["Permit Subtype", "Duration"])
+
+    rows["Cleaned"] = duration_cap_mask(rows)
+    rows["Band"] = classify_frame(rows)
+    rows["Issuance Band"] = classify_frame(rows, duration_col="Issuance Duration")
+    if "Job Start Date" in df.columns:
+        rows["Start Year"] = parse_dates(df.loc[rows.index, "Job Start Date"]).dt.year.astype("Int64")
+    else:
+        rows["Start Year"] = pd.array([pd.NA] * len(rows), dtype="Int64")
+    return rows
+
+
+# cube_rows of every sheet in one frame; boroughs keep the workbook sheet order
+def all_cube_rows(sheets, duration_from=None):
+    parts = []
+    for sheet, df in sheets.items():
+        with stage("cube_rows", sheet, rows_in=df) as record:
+            parts.append(cube_rows(df, sheet, duration_from))
+            record["rows_out"] = parts[-1]
+    rows = pd.concat(parts, ignore_index=True)
+    rows["Borough"] = pd.Categorical(rows["Borough"], categories=list(sheets))
+    return rows
+
+
+# Cube of already loaded sheets
+def build_cube(sheets, duration_from=None):
+    return group_cube(all_cube_rows(sheets, duration_from))
+
+
+# One grouped pass over all rows: count, sum, sum of squares and histogram per cell
+def group_cube(rows):
+    with stage("cube_group", rows_in=rows) as record:
+        rows = rows.assign(Bin=hist_bins(rows["Duration"]))
+        rows["Sq"] = rows["Duration"] ** 2
+
+        grouped = rows.groupby(DIMS + ["Bin"], dropna=False, observed=True).agg(
+            count=("Duration", "size"), sum=("Duration", "sum"), sumsq=("Sq", "sum"))
+        cube = cube_from_bins(grouped)
+        record["rows_out"] = cube
+    return cube
+
+
+# Cube table from count/sum/sumsq indexed by DIMS + histogram bin (also used by permit_lazy)
+def cube_from_bins(grouped):
+    hist = grouped["count"].unstack("Bin", fill_value=0)
+    hist = hist.reindex(columns=range(len(HIST_EDGES)), fill_value=0)
+    hist.columns = HIST_COLUMNS
+
+    totals = grouped.groupby(level=DIMS, dropna=False, observed=True)[["count", "sum", "sumsq"]].sum()
+    cube = totals.join(hist).reset_index()
+    for band in ("Band", "Issuance Band"):
+        cube[band] = pd.Categorical(cube[band], categories=LABELS, ordered=True)
+    return cube
+
+
+# Sum the cube over every dimension not in `by` (e.g. NYC totals: by without "Borough")
+def rollup(cube, by):
+    result = cube.groupby(by, dropna=False, observed=True)[MEASURES].sum()
+    result["mean"] = result["sum"] / result["count"]
+    variance = (result["sumsq"] - result["sum"] ** 2 / result["count"]) / (result["count"] - 1)
+    result["std"] = np.sqrt(variance.clip(lower=0))
+    return result
+
+
+# Mean duration per subtype, one column per borough plus "NYC"
+def mean_duration(cube, subtypes=("MH", "BL")):
+    by_borough = rollup(cube, ["Permit Subtype", "Borough"])["mean"].unstack("Borough")
+    by_borough = by_borough[list(cube["Borough"].unique())]
+    by_borough["NYC"] = rollup(cube, ["Permit Subtype"])["mean"]
+    return by_borough.reindex(list(subtypes))
+
+
+# Permit counts per height band for each subtype (all boroughs when borough is None)
+def band_counts(cube, borough=None, subtypes=("MH", "BL"), band="Band"):
+    if borough is not None:
+        cube = cube[cube["Borough"] == borough]
+    counts = rollup(cube, ["Permit Subtype", band])["count"].unstack(band)
+    return counts.reindex(index=list(subtypes), columns=LABELS).fillna(0)
+
+
+def _cube_prefix(path, duration_from):
+    variant = "duration" if duration_from is None else duration_from.lower().replace(" ", "_")
+    return os.path.join(cache_dir_for(path), f"cube_{variant}")
+
+
+def _cube_file(path, duration_from):
+    return f"{_cube_prefix(path, duration_from)}_v{CUBE_VERSION}_{source_hash(path)[:16]}.parquet"
+
+
+# Cube of a workbook, persisted next to its Parquet cache and rebuilt when the source changes
+# (backend="polars" builds the same cube with lazy queries over the snapshot)
+def load_cube(path, duration_from=None, backend="pandas"):
+    prefix = _cube_prefix(path, duration_from)
+    cube_file = _cube_file(path, duration_from)
+    if os.path.exists(cube_file):
+        with stage("cube_read") as record:
+            record["rows_out"] = cube = pd.read_parquet(cube_file)
+        return cube
+
+    if backend == "polars":
+        from permit_lazy import build_cube_lazy
+        cube = build_cube_lazy(path, duration_from)
+    else:
+        cube = build_cube(load_workbook(path, columns=CUBE_COLUMNS), duration_from)
+    for stale in glob.glob(f"{prefix}_*.parquet"):
+        os.remove(stale)
+    os.makedirs(os.path.dirname(cube_file), exist_ok=True)
+    cube.to_parquet(cube_file, index=False)
+    return cube
@@ -0,0 +1,71 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Date columns of the DOB permit extract
+DATE_COLUMNS = ["Filing Date", "Issuance Date", "Expiration Date", "Job Start Date"]
+
+# Formats tried in order before falling back to pandas' own inference
+DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%Y %H:%M:%S", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]
+
+
+# Cutoff of a refresh run on `today`: permits expiring before this year have finished
+def refresh_cutoff_year(today=None):
+    return (today or datetime.date.today()).year
+
+
+# Permits expiring in this year or later are "NOT COMPLETED". The default is the year of
+# the run, as for the incremental store, so both write the same Job Finish.
+CUTOFF_YEAR = refresh_cutoff_year()
+
+
+def _parse_unique(uniques, formats):
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    is_text = uniques.map(lambda v: isinstance(v, str))
+
+    # Datetimes/timestamps coming from Excel cells
+    if (~is_text).any():
+        parsed[~is_text] = pd.to_datetime(uniques[~is_text], errors="coerce")
+
+    todo = is_text.copy()
+    text = uniques.where(is_text).str.strip()
+    for fmt in formats:
+        if not todo.any():
+            break
+        attempt = pd.to_datetime(text[todo], format=fmt, errors="coerce")
+        parsed[attempt.index] = parsed[attempt.index].fillna(attempt)
+        todo &= parsed.isna()
+
+    if todo.any():
+        parsed[todo] = pd.to_datetime(text[todo], format="mixed", errors="coerce")
+    return parsed.to_numpy()
+
+
+# Parse a date column once per distinct value (DOB dates repeat heavily)
+def parse_dates(values, formats=DATE_FORMATS):
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    parsed = _parse_unique(uniques, formats)
+    result = np.full(len(series), np.datetime64("NaT"), dtype="datetime64[ns]")
+    valid = codes >= 0
+    result[valid] = parsed[codes[valid]]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+# Parse every date column present in the frame, in place
+def parse_date_columns(df, columns=DATE_COLUMNS, formats=DATE_FORMATS):
+    for col in columns:
+        if col in df.columns:
+            df[col] = parse_dates(df[col], formats)
+    return df
+
+
+# "COMPLETED"/"NOT COMPLETED" status from the expiration date (None when missing)
+def job_finish(expiration, cutoff_year=CUTOFF_YEAR):
+    expiration = parse_dates(expiration)
+    status = np.where(expiration.dt.year >= cutoff_year, "NOT COMPLETED", "COMPLETED")
+    return pd.Series(status, index=expiration.index, dtype=object).where(expiration.notna())
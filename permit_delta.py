@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from permit_cache import sheet_file, typed_columns
+from permit_dates import job_finish, refresh_cutoff_year
+from permit_pipeline import duration_cap_mask, order_by_subtype, process_sheet
+from permit_schema import compact_frame
+from permit_stream import iter_chunks
+
+# Processed dataset: per borough, one Parquet part of "completed" rows per applied delta,
+# next to the keys that delta superseded. A permit's current row is the one in the latest
+# part whose keys include it, so a refresh writes only its own part.
+STORE_DIR = "permit_store"
+STORE_MANIFEST = "store.json"
+
+# Identifier of a permit: job, job document and permit sequence
+KEY_COLUMNS = ["Job #", "Job doc. #", "Permit Sequence #"]
+KEY_SEPARATOR = "|"
+
+
+def _read_store_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, STORE_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"sheets": [], "cutoff_year": None, "parts": {}, "next_part": 0}
+    return manifest
+
+
+def _write_store_manifest(store_dir, manifest):
+    with open(os.path.join(store_dir, STORE_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+# One key column as text: whole numbers print as integers whatever their dtype (Int16 in the
+# store, float64 in a csv delta with a blank cell), other values as stripped text, missing as "<NA>"
+def _key_text(values):
+    numbers = pd.to_numeric(values.astype(object), errors="coerce")
+    whole = numbers.notna() & (numbers == numbers.round())
+    text = values.astype(object).where(values.isna(), values.astype(str).str.strip()).astype(object)
+    text[whole] = numbers[whole].astype("int64").astype(str)
+    return text.fillna("<NA>").astype(str)
+
+
+def _key_frame(df):
+    keys = [c for c in KEY_COLUMNS if c in df.columns]
+    if not keys:
+        raise KeyError(f"none of the key columns {KEY_COLUMNS} found")
+    return pd.DataFrame({col: _key_text(df[col]) for col in keys}, index=df.index)
+
+
+# Key of every row as normalized strings, so the store and a raw delta give the same keys
+def permit_keys(df):
+    return pd.MultiIndex.from_frame(_key_frame(df))
+
+
+# The same keys joined into one string per row (the form kept in the parts' key files)
+def key_strings(df):
+    keys = _key_frame(df)
+    joined = keys.iloc[:, 0]
+    for col in keys.columns[1:]:
+        joined = joined + KEY_SEPARATOR + keys[col]
+    return joined.rename("key")
+
+
+# Raw rows of a delta extract (.xlsx with one sheet per borough, or .csv), read in chunks
+def read_delta(path):
+    parts = {}
+    for sheet, chunk in iter_chunks(path, columns=None):
+        parts.setdefault(sheet, []).append(chunk)
+    return {sheet: pd.concat(chunks, ignore_index=True) for sheet, chunks in parts.items()}
+
+
+def _expiration_years(df):
+    years = df["Expiration Date"].dt.year.dropna() if "Expiration Date" in df.columns else pd.Series()
+    return None if years.empty else [int(years.min()), int(years.max())]
+
+
+# Write the rows of one delta and the keys it supersedes as a new part of the borough
+def _write_part(store_dir, manifest, sheet, rows, keys):
+    name = f"part-{manifest['next_part']:05d}"
+    manifest["next_part"] += 1
+    folder = os.path.splitext(sheet_file(sheet))[0]
+    os.makedirs(os.path.join(store_dir, folder), exist_ok=True)
+    part = {"rows": os.path.join(folder, name + ".parquet"), "keys": os.path.join(folder, name + ".keys.parquet"),
+            "expiration_years": _expiration_years(rows)}
+    rows.to_parquet(os.path.join(store_dir, part["rows"]), index=False)
+    keys.to_frame().to_parquet(os.path.join(store_dir, part["keys"]), index=False)
+    manifest["parts"].setdefault(sheet, []).append(part)
+    return part
+
+
+# Current rows of one borough: every part's rows, minus those superseded by a later part
+def _load_sheet(store_dir, parts):
+    frames = [pd.read_parquet(os.path.join(store_dir, part["rows"])) for part in parts]
+    if len(frames) == 1:
+        return frames[0]
+
+    row_keys = [key_strings(frame) for frame in frames]
+    superseded = pd.concat([
+        pd.read_parquet(os.path.join(store_dir, part["keys"])).assign(part=i)
+        for i, part in enumerate(parts)
+    ], ignore_index=True)
+    latest = superseded.groupby("key")["part"].max()
+
+    current = [frame[(latest.reindex(keys.to_numpy()).to_numpy() == i)]
+               for i, (frame, keys) in enumerate(zip(frames, row_keys))]
+    # Parts are typed separately: the schema is applied again to the combined rows
+    return compact_frame(pd.concat(current, ignore_index=True))
+
+
+def load_store(store_dir=STORE_DIR):
+    manifest = _read_store_manifest(store_dir)
+    return {sheet: _load_sheet(store_dir, manifest["parts"][sheet]) for sheet in manifest["sheets"]}
+
+
+# Upsert the delta rows: permits present in the delta replace the stored ones (and
+# disappear if they no longer pass the filters). Only the delta is processed and typed,
+# and it is written as a new part, so stored rows are neither read nor rewritten.
+# The cutoff defaults to the year of the refresh; when it moves on, the stored rows
+# whose expiration year has passed flip to COMPLETED.
+def apply_delta(delta, store_dir=STORE_DIR, cutoff_year=None):
+    cutoff_year = cutoff_year if cutoff_year is not None else refresh_cutoff_year()
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = _read_store_manifest(store_dir)
+    summary = {}
+
+    for sheet, raw in delta.items():
+        keys = key_strings(raw)
+        raw = raw[~keys.duplicated(keep="last")]
+        _, completed, _ = process_sheet(raw, cutoff_year, intermediates=True)
+        if completed is None:
+            continue
+
+        if sheet not in manifest["sheets"]:
+            manifest["sheets"].append(sheet)
+        _write_part(store_dir, manifest, sheet, typed_columns(completed), keys[raw.index])
+        summary[sheet] = {"delta_rows": len(raw), "kept": len(completed),
+                          "parts": len(manifest["parts"][sheet])}
+
+    if manifest["cutoff_year"] not in (None, cutoff_year):
+        summary["refreshed"] = refresh_job_finish(store_dir, cutoff_year, manifest["sheets"], manifest)
+    manifest["cutoff_year"] = cutoff_year
+    _write_store_manifest(store_dir, manifest)
+    return summary
+
+
+# Recompute Job Finish after the cutoff year changes. Only parts with expiration years
+# between the old and the new cutoff can flip, and only those with flipped rows are rewritten.
+def refresh_job_finish(store_dir=STORE_DIR, cutoff_year=None, sheets=None, manifest=None):
+    cutoff_year = cutoff_year if cutoff_year is not None else refresh_cutoff_year()
+    write = manifest is None
+    manifest = manifest if manifest is not None else _read_store_manifest(store_dir)
+    sheets = sheets if sheets is not None else manifest["sheets"]
+    previous = manifest["cutoff_year"]
+    low, high = (None, None) if previous is None else sorted((previous, cutoff_year))
+    flipped = 0
+    for sheet in sheets:
+        for part in manifest["parts"][sheet]:
+            years = part["expiration_years"]
+            if low is not None and years is not None and (years[1] < low or years[0] >= high):
+                continue
+            path = os.path.join(store_dir, part["rows"])
+            df = pd.read_parquet(path)
+            status = job_finish(df["Expiration Date"], cutoff_year)
+            changed = int((status.fillna("") != df["Job Finish"].astype(object).fillna("")).sum())
+            if changed:
+                df["Job Finish"] = status
+                df.to_parquet(path, index=False)
+                flipped += changed
+    if write:
+        manifest["cutoff_year"] = cutoff_year
+        _write_store_manifest(store_dir, manifest)
+    return flipped
+
+
+# Rewrite each borough as a single part (its current rows), dropping superseded rows
+def compact_store(store_dir=STORE_DIR):
+    manifest = _read_store_manifest(store_dir)
+    for sheet in manifest["sheets"]:
+        old = manifest["parts"][sheet]
+        if len(old) == 1:
+            continue
+        rows = _load_sheet(store_dir, old)
+        manifest["parts"][sheet] = []
+        _write_part(store_dir, manifest, sheet, rows, key_strings(rows))
+        for part in old:
+            for name in (part["rows"], part["keys"]):
+                os.remove(os.path.join(store_dir, name))
+    _write_store_manifest(store_dir, manifest)
+
+
+# Write PROJECT_completed.xlsx / PROJECT_cleaned.xlsx from the store
+def export(store_dir=STORE_DIR, output_dir="."):
+    store = load_store(store_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    completed_path = os.path.join(output_dir, "PROJECT_completed.xlsx")
+    cleaned_path = os.path.join(output_dir, "PROJECT_cleaned.xlsx")
+    with pd.ExcelWriter(completed_path, engine="openpyxl") as completed_writer, \
+            pd.ExcelWriter(cleaned_path, engine="openpyxl") as cleaned_writer:
+        for sheet, df in store.items():
+            df.to_excel(completed_writer, sheet_name=sheet, index=False)
+            cleaned = order_by_subtype(df[duration_cap_mask(df)])
+            cleaned.to_excel(cleaned_writer, sheet_name=sheet, index=False)
+    print("Completed file saved to:", completed_path)
+    print("Cleaned file saved to:", cleaned_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental update of the processed permit dataset")
+    parser.add_argument("delta", nargs="?",
+                        help="delta extract: .xlsx with one sheet per borough, or <Borough>.csv; "
+                             "passing the full base builds the store; without it only Job Finish is refreshed")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--cutoff-year", type=int, default=None,
+                        help="permits expiring in this year or later are NOT COMPLETED (default: the current year)")
+    parser.add_argument("--export", metavar="OUTPUT_DIR",
+                        help="also write PROJECT_completed.xlsx and PROJECT_cleaned.xlsx")
+    parser.add_argument("--compact", action="store_true",
+                        help="afterwards rewrite each borough as a single part")
+    parser.add_argument("--charts", metavar="OUTPUT_DIR",
+                        help="also redraw the chart book figures whose data changed")
+    args = parser.parse_args()
+
+    summary = apply_delta(read_delta(args.delta) if args.delta else {}, args.store, args.cutoff_year)
+    for sheet, stats in summary.items():
+        print(sheet, stats)
+    if args.compact:
+        compact_store(args.store)
+    if args.export:
+        export(args.store, args.export)
+    if args.charts:
+        from chart_book import render_book
+        render_book(load_store(args.store), output_dir=args.charts)
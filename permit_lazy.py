@@ -0,0 +1,195 @@
+import glob
+import os
+
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+from height_bands import BANDS, LABELS
+from permit_cache import snapshot_files
+from permit_cube import DIMS, HIST_BIN_DAYS, HIST_EDGES, cube_from_bins
+from permit_dates import CUTOFF_YEAR, DATE_FORMATS
+from permit_pipeline import DURATION_LIMITS, SELECTION
+from permit_trace import stage
+
+# Optional Polars backend: the pipeline and cube queries run lazily over Parquet (or csv),
+# so filters and column selections are pushed into the scan and execution streams in
+# batches on all cores. The results match the pandas functions they mirror.
+
+
+def _require_polars():
+    if pl is None:
+        raise ImportError("the polars backend needs the polars package (pip install polars)")
+
+
+# Run a lazy query with the streaming engine (older Polars: streaming=True)
+def collect(lf):
+    try:
+        return lf.collect(engine="streaming")
+    except TypeError:
+        return lf.collect(streaming=True)
+
+
+# {sheet name: LazyFrame} for a workbook (through its Parquet snapshot) or a folder
+# of one .parquet / .csv file per sheet (as written by permit_synth.py)
+def scan_sheets(path):
+    _require_polars()
+    if not os.path.isdir(path):
+        return {sheet: pl.scan_parquet(file) for sheet, file in snapshot_files(path).items()}
+
+    sheets = {}
+    for file in sorted(glob.glob(os.path.join(path, "*.parquet")) + glob.glob(os.path.join(path, "*.csv"))):
+        sheet = os.path.splitext(os.path.basename(file))[0]
+        if file.endswith(".parquet"):
+            sheets[sheet] = pl.scan_parquet(file)
+        else:
+            sheets[sheet] = pl.scan_csv(file, infer_schema_length=10_000)
+    return sheets
+
+
+# Date column as Datetime: text goes through DATE_FORMATS in order (like permit_dates.parse_dates)
+def parse_date(col, dtype):
+    if dtype in (pl.String, pl.Categorical):
+        text = pl.col(col).cast(pl.String).str.strip_chars()
+        return pl.coalesce([text.str.strptime(pl.Datetime("ns"), fmt, strict=False) for fmt in DATE_FORMATS])
+    return pl.col(col).cast(pl.Datetime("ns"))
+
+
+# col.isin(values), with the values as text when the column was read as text
+def _is_in(col, values, dtype):
+    if dtype in (pl.String, pl.Categorical):
+        return pl.col(col).cast(pl.String).is_in([str(v) for v in values])
+    return pl.col(col).is_in(values)
+
+
+def selection_filter(schema):
+    mask = pl.lit(True)
+    for col, values in SELECTION.items():
+        mask = mask & _is_in(col, values, schema[col]).fill_null(False)
+    return mask
+
+
+# Days between two date columns, as float like the pandas Duration column
+def duration_days(end, start, schema):
+    days = (parse_date(end, schema[end]) - parse_date(start, schema[start])).dt.total_days()
+    return days.cast(pl.Float64)
+
+
+# Lazy version of permit_pipeline.process_sheet (cleaned rows of one sheet)
+def cleaned_query(lf, cutoff_year=CUTOFF_YEAR):
+    schema = lf.collect_schema()
+    if "Expiration Date" not in schema or "Job Start Date" not in schema:
+        return None
+    subtype = pl.col("Permit Subtype").cast(pl.String).str.strip_chars()
+    limit = subtype.replace_strict(DURATION_LIMITS, default=None, return_dtype=pl.Float64)
+    rank = subtype.replace_strict({s: i for i, s in enumerate(DURATION_LIMITS)}, default=None,
+                                  return_dtype=pl.Int64)
+
+    return (
+        lf.with_row_index("_row")
+        .filter(selection_filter(schema) & subtype.is_in(list(DURATION_LIMITS)))
+        .with_columns(
+            pl.col("Permit Subtype").cast(pl.String).str.strip_chars(),
+            parse_date("Expiration Date", schema["Expiration Date"]).alias("Expiration Date"),
+            parse_date("Job Start Date", schema["Job Start Date"]).alias("Job Start Date"),
+            duration_days("Expiration Date", "Job Start Date", schema).alias("Duration"),
+            limit.alias("_limit"),
+            rank.alias("_rank"),
+        )
+        .with_columns(
+            pl.when(pl.col("Expiration Date").is_null()).then(None)
+            .when(pl.col("Expiration Date").dt.year() >= cutoff_year).then(pl.lit("NOT COMPLETED"))
+            .otherwise(pl.lit("COMPLETED")).alias("Job Finish")
+        )
+        .filter(pl.col("Duration") <= pl.col("_limit"))
+        .sort(["_rank", "_row"])
+        .drop(["_row", "_limit", "_rank"])
+    )
+
+
+# {sheet: cleaned DataFrame}, the same frames as permit_pipeline.run's "cleaned" stage
+def cleaned_sheets(path, cutoff_year=CUTOFF_YEAR):
+    results = {}
+    for sheet, lf in scan_sheets(path).items():
+        query = cleaned_query(lf, cutoff_year)
+        if query is None:
+            continue
+        with stage("lazy_clean", sheet) as record:
+            results[sheet] = collect(query).to_pandas()
+            record["rows_out"] = results[sheet]
+    return results
+
+
+# Band label of each row (searchsorted "left" over the subtype's limits, like height_bands)
+def band_expr(duration, subtype):
+    code = pl.lit(None, dtype=pl.Int64)
+    for name, limits in reversed(list(BANDS.items())):
+        band = sum((duration > limit).cast(pl.Int64) for limit in limits)
+        code = pl.when(subtype == name).then(band).otherwise(code)
+    return pl.when(duration.is_not_null()).then(code).replace_strict(
+        dict(enumerate(LABELS)), default=None, return_dtype=pl.String)
+
+
+# Lazy version of permit_cube.cube_rows + the grouped pass: only the needed columns are read
+def cube_query(lf, borough, duration_from=None):
+    schema = lf.collect_schema()
+    if duration_from is None:
+        duration = pl.col("Duration").cast(pl.Float64).fill_nan(None)
+    else:
+        duration = duration_days("Expiration Date", duration_from, schema)
+    if "Job Start Date" in schema:
+        start_year = parse_date("Job Start Date", schema["Job Start Date"]).dt.year().cast(pl.Int64)
+    else:
+        start_year = pl.lit(None, dtype=pl.Int64)
+    if "Issuance Date" in schema and "Expiration Date" in schema:
+        issuance = duration_days("Expiration Date", "Issuance Date", schema)
+    else:
+        issuance = pl.lit(None, dtype=pl.Float64)
+
+    rows = lf.select(
+        pl.lit(borough).alias("Borough"),
+        pl.col("Permit Subtype").cast(pl.String).str.strip_chars().alias("Permit Subtype"),
+        duration.alias("Duration"),
+        issuance.alias("Issuance Duration"),
+        start_year.alias("Start Year"),
+    ).filter(pl.col("Permit Subtype").is_not_null() & pl.col("Duration").is_not_null())
+
+    limit = pl.col("Permit Subtype").replace_strict(DURATION_LIMITS, default=None, return_dtype=pl.Float64)
+    last_bin = len(HIST_EDGES) - 1
+    return (
+        rows.with_columns(
+            (pl.col("Duration") <= limit).fill_null(False).alias("Cleaned"),
+            band_expr(pl.col("Duration"), pl.col("Permit Subtype")).alias("Band"),
+            band_expr(pl.col("Issuance Duration"), pl.col("Permit Subtype")).alias("Issuance Band"),
+            (pl.col("Duration").clip(lower_bound=0) // HIST_BIN_DAYS).clip(upper_bound=last_bin)
+            .cast(pl.Int64).alias("Bin"),
+        )
+        .group_by(DIMS + ["Bin"])
+        .agg(
+            pl.len().cast(pl.Int64).alias("count"),
+            pl.col("Duration").sum().alias("sum"),
+            (pl.col("Duration") ** 2).sum().alias("sumsq"),
+        )
+    )
+
+
+# permit_cube.build_cube through lazy queries: only the grouped cells are brought into pandas
+def build_cube_lazy(path, duration_from=None):
+    sheets = scan_sheets(path)
+    parts = []
+    for sheet, lf in sheets.items():
+        with stage("lazy_cube", sheet) as record:
+            parts.append(collect(cube_query(lf, sheet, duration_from)).to_pandas())
+            record["rows_out"] = parts[-1]
+
+    grouped = pd.concat(parts, ignore_index=True)
+    grouped["Borough"] = pd.Categorical(grouped["Borough"], categories=list(sheets))
+    for band in ("Band", "Issuance Band"):
+        grouped[band] = pd.Categorical(grouped[band], categories=LABELS, ordered=True)
+    grouped["Start Year"] = grouped["Start Year"].astype("Int64")
+    # The same grouped index as permit_cube.build_cube, so null Bands keep their histogram
+    grouped = grouped.groupby(DIMS + ["Bin"], dropna=False, observed=True)[["count", "sum", "sumsq"]].sum()
+    return cube_from_bins(grouped)
@@ -0,0 +1,145 @@
+import argparse
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from permit_cache import load_workbook, map_sheets
+from permit_dates import CUTOFF_YEAR, job_finish, parse_dates
+from permit_trace import stage as trace_stage
+
+# Selection filters (columns B-F of PROJECT_base.xlsx)
+SELECTION = {
+    "Job Type": ["A2"],
+    "Bldg Type": [2],
+    "Residential": ["YES"],
+    "Work Type": ["BL", "MH"],
+    "Permit Status": ["ISSUED", "RE-ISSUED"],
+}
+
+# Columns used after selection (everything else is dropped at ingest when streaming)
+DOWNSTREAM_COLUMNS = list(SELECTION) + [
+    "BOROUGH", "Borough", "Job #", "Job doc. #", "Permit Sequence #", "Permit Subtype",
+    "Issuance Date", "Expiration Date", "Job Start Date",
+]
+
+# Duration limits for each permit type
+DURATION_LIMITS = {
+    "MH": 271,
+    "BL": 181
+}
+
+# All selection filters combined into one boolean mask
+def selection_mask(df):
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in SELECTION.items():
+        mask &= df[col].isin(values).to_numpy()
+    return mask
+
+
+# Duration in days and "COMPLETED"/"NOT COMPLETED" status
+def add_duration(df, cutoff_year=CUTOFF_YEAR):
+    df["Expiration Date"] = parse_dates(df["Expiration Date"])
+    df["Job Start Date"] = parse_dates(df["Job Start Date"])
+    df["Duration"] = (df["Expiration Date"] - df["Job Start Date"]).dt.days
+    df["Job Finish"] = job_finish(df["Expiration Date"], cutoff_year)
+    return df
+
+
+# Rows with a known subtype whose duration is within its limit
+def duration_cap_mask(df):
+    limits = df["Permit Subtype"].astype(object).map(DURATION_LIMITS).astype(float)
+    return (df["Duration"] <= limits).fillna(False).to_numpy(dtype=bool)
+
+
+# Cleaned rows grouped by subtype, in DURATION_LIMITS order
+def order_by_subtype(df):
+    rank = pd.Categorical(df["Permit Subtype"], categories=list(DURATION_LIMITS)).codes
+    return df.iloc[np.argsort(rank, kind="stable")].reset_index(drop=True)
+
+
+# Selected, completed and cleaned frames of one sheet in a single pass.
+# Without intermediates, rows of other subtypes are dropped by the first mask.
+def process_sheet(df, cutoff_year=CUTOFF_YEAR, intermediates=False):
+    if "Expiration Date" not in df.columns or "Job Start Date" not in df.columns:
+        return None, None, None
+
+    with trace_stage("select", rows_in=df) as record:
+        mask = selection_mask(df)
+        subtype = df["Permit Subtype"].str.strip()
+        if not intermediates:
+            mask &= subtype.isin(list(DURATION_LIMITS)).to_numpy()
+
+        selected = df[mask].copy()
+        selected["Permit Subtype"] = subtype[mask]
+        record["rows_out"] = selected
+    with trace_stage("dates", rows_in=selected) as record:
+        completed = add_duration(selected.copy() if intermediates else selected, cutoff_year)
+        record["rows_out"] = completed
+    with trace_stage("clean", rows_in=completed) as record:
+        cleaned = order_by_subtype(completed[duration_cap_mask(completed)])
+        record["rows_out"] = cleaned
+
+    if not intermediates:
+        return None, None, cleaned
+    return selected, completed, cleaned
+
+
+# backend="polars" runs the same steps as lazy queries over the Parquet snapshot (see permit_lazy)
+def run(input_path, output_dir=".", cutoff_year=CUTOFF_YEAR, intermediates=False,
+        stream=False, chunksize=None, workers=1, backend="pandas"):
+    results = {"selected": {}, "completed": {}, "cleaned": {}}
+    if backend == "polars":
+        if intermediates or stream:
+            raise ValueError("the polars backend writes PROJECT_cleaned.xlsx only and reads the input lazily")
+        from permit_lazy import cleaned_sheets
+        results["cleaned"] = cleaned_sheets(input_path, cutoff_year)
+    else:
+        if stream:
+            from permit_stream import CHUNK_SIZE, stream_selected
+            sheets = stream_selected(input_path, chunksize or CHUNK_SIZE)
+        else:
+            sheets = load_workbook(input_path, workers=workers)
+
+        processed = map_sheets(partial(process_sheet, cutoff_year=cutoff_year, intermediates=intermediates),
+                               sheets, workers)
+        for sheet, (selected, completed, cleaned) in processed.items():
+            if cleaned is None:
+                continue
+            results["cleaned"][sheet] = cleaned
+            if intermediates:
+                results["selected"][sheet] = selected
+                results["completed"][sheet] = completed
+
+    os.makedirs(output_dir, exist_ok=True)
+    for stage in ("selected", "completed", "cleaned"):
+        if not results[stage]:
+            continue
+        output_path = os.path.join(output_dir, f"PROJECT_{stage}.xlsx")
+        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+            for sheet, df in results[stage].items():
+                with trace_stage("excel_write", sheet, rows_in=df):
+                    df.to_excel(writer, sheet_name=sheet, index=False)
+        print(f"{stage.capitalize()} file saved to:", output_path)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PROJECT_base.xlsx -> PROJECT_cleaned.xlsx in one pass")
+    parser.add_argument("input", nargs="?", default="PROJECT_base.xlsx")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--cutoff-year", type=int, default=CUTOFF_YEAR)
+    parser.add_argument("--intermediates", action="store_true",
+                        help="also write PROJECT_selected.xlsx and PROJECT_completed.xlsx")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the input (.xlsx or .csv) in chunks, keeping only selected rows and used columns")
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for parsing and processing sheets (default: all cores)")
+    parser.add_argument("--backend", choices=["pandas", "polars"], default="pandas",
+                        help="polars: lazy queries over the Parquet snapshot (or a folder of csv/parquet sheets)")
+    args = parser.parse_args()
+    run(args.input, args.output_dir, args.cutoff_year, args.intermediates, args.stream, args.chunksize,
+        args.workers, args.backend)
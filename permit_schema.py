@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from permit_dates import DATE_COLUMNS, parse_dates
+
+# Low-cardinality text fields: stored as categoricals, stripped once at ingest (except UNSTRIPPED_COLUMNS)
+CATEGORY_COLUMNS = [
+    "BOROUGH", "Borough", "Permit Subtype", "Work Type", "Permit Status", "Job Type", "Job Finish",
+    "Fascia_Edificio", "Residential", "Permit Type", "Filing Status",
+]
+
+# Selection columns (permit_pipeline.SELECTION) keep their raw values: selection compares
+# them exactly, as the stream, delta and polars paths do on the raw extract
+UNSTRIPPED_COLUMNS = ["Job Type", "Residential", "Work Type", "Permit Status"]
+
+# Whole-number fields: nullable integers (missing values stay <NA> instead of forcing float64)
+INTEGER_COLUMNS = {
+    "Duration": "Int32",
+    "Permit Sequence": "Int16",
+    "Permit Sequence #": "Int16",
+    "Job doc. #": "Int16",
+    "Bldg Type": "Int16",
+}
+
+
+def _stripped_category(series, strip=True):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if not strip or not pd.api.types.is_string_dtype(categories) or (categories == categories.str.strip()).all():
+            return series
+        series = series.astype(object)
+    text = series.astype(str)
+    text = series.where(series.isna(), text.str.strip() if strip else text)
+    return text.astype("category")
+
+
+# The integer dtype when every value is whole and fits, otherwise None
+def _integer_dtype(series, dtype):
+    if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return None
+    values = series.dropna().to_numpy(dtype=float)
+    if len(values) and not np.array_equal(values, np.round(values)):
+        return None
+    info = np.iinfo(dtype.lower())
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return None
+    return dtype
+
+
+# Apply the declared schema in place: datetime64 dates, stripped categoricals, small nullable ints
+def compact_frame(df):
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_dates(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = _stripped_category(df[col], strip=col not in UNSTRIPPED_COLUMNS)
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns and df[col].dtype != dtype:
+            target = _integer_dtype(df[col], dtype)
+            if target is not None:
+                df[col] = df[col].astype(target)
+    return df
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+# Memory of each sheet before and after the schema, from {sheet: (raw MB, compact MB)}
+def memory_report(sizes):
+    report = pd.DataFrame(sizes, index=["raw_mb", "compact_mb"]).T
+    report.loc["TOTAL"] = report.sum()
+    report["ratio"] = report["raw_mb"] / report["compact_mb"]
+    return report.round(2)
+
+
+def _frozen(values):
+    values = np.array(values, copy=True)
+    values.setflags(write=False)
+    return values
+
+
+def _read_only_array(array):
+    if isinstance(array, pd.Categorical):
+        return pd.Categorical.from_codes(_frozen(array.codes), dtype=array.dtype)
+    if isinstance(array, (pd.arrays.NumpyExtensionArray, pd.arrays.TimedeltaArray)) or \
+            (isinstance(array, pd.arrays.DatetimeArray) and array.tz is None):
+        return _frozen(array.to_numpy())
+    if hasattr(array, "_data") and hasattr(array, "_mask"):
+        # Nullable Int/Float/boolean arrays: values and mask
+        return type(array)(_frozen(array._data), _frozen(array._mask))
+    # Arrow-backed columns (str) are immutable already; tz-aware dates are left as they are
+    return array
+
+
+# The same frame over read-only buffers (numbers, dates, category codes, masks), so a single
+# copy can be shared between sessions: any attempt to write through it raises
+def read_only_frame(df):
+    columns = {col: pd.Series(_read_only_array(df[col].array), index=df.index, name=col, copy=False)
+               for col in df.columns}
+    return pd.DataFrame(columns, index=df.index, copy=False)
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+
+from permit_dates import parse_date_columns
+from permit_pipeline import DOWNSTREAM_COLUMNS, selection_mask
+from permit_schema import compact_frame
+from permit_trace import stage
+
+# Rows read per chunk
+CHUNK_SIZE = 50_000
+
+
+def _sheet_chunks(ws, chunksize, columns):
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = [str(h).strip() if h is not None else "" for h in header]
+    keep = [i for i, h in enumerate(header) if columns is None or h in columns]
+    names = [header[i] for i in keep]
+
+    chunk = []
+    for row in rows:
+        chunk.append([row[i] if i < len(row) else None for i in keep])
+        if len(chunk) >= chunksize:
+            yield pd.DataFrame(chunk, columns=names)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=names)
+
+
+# Yield (sheet name, chunk DataFrame) from an .xlsx (openpyxl read-only) or a .csv export
+def iter_chunks(path, chunksize=CHUNK_SIZE, columns=DOWNSTREAM_COLUMNS):
+    if path.lower().endswith(".csv"):
+        sheet = os.path.splitext(os.path.basename(path))[0]
+        usecols = None if columns is None else (lambda c: c.strip() in columns)
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols, skipinitialspace=True):
+            chunk.columns = [c.strip() for c in chunk.columns]
+            yield sheet, chunk
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            for chunk in _sheet_chunks(ws, chunksize, columns):
+                yield ws.title, chunk
+    finally:
+        wb.close()
+
+
+# {sheet name: selected rows}; peak memory depends on the chunk size, not the sheet size
+def stream_selected(path, chunksize=CHUNK_SIZE, columns=DOWNSTREAM_COLUMNS):
+    parts = {}
+    chunks = iter_chunks(path, chunksize, columns)
+    while True:
+        # Reading is timed apart from selection (the chunk's sheet is known once it is read)
+        with stage("stream_read") as record:
+            item = next(chunks, None)
+            if item is not None:
+                record["sheet"], record["rows_out"] = item
+        if item is None:
+            break
+        sheet, chunk = item
+        with stage("stream_select", sheet, rows_in=chunk) as record:
+            selected = parse_date_columns(chunk[selection_mask(chunk)].copy())
+            record["rows_out"] = selected
+        parts.setdefault(sheet, []).append(selected)
+    return {sheet: compact_frame(pd.concat(chunks, ignore_index=True)) for sheet, chunks in parts.items()}
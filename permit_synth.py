@@ -0,0 +1,146 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Borough sheets of PROJECT_base.xlsx and their share of the permits
+SHEETS = {
+    "Manhattan": 0.40,
+    "Brooklyn": 0.25,
+    "Queens": 0.20,
+    "Bronx": 0.10,
+    "Staten Island": 0.05,
+}
+
+# Rows per worksheet allowed by Excel (header included)
+XLSX_MAX_ROWS = 1_048_576
+
+CHUNK_SIZE = 500_000
+
+# Categorical columns: values and probabilities
+CHOICES = {
+    "Job Type": (["A2", "A1", "A3", "NB", "DM"], [0.55, 0.15, 0.15, 0.10, 0.05]),
+    "Bldg Type": ([2, 1], [0.75, 0.25]),
+    "Residential": (["YES", None], [0.70, 0.30]),
+    "Work Type": (["BL", "MH", "PL", "SP", "EQ", "OT"], [0.25, 0.30, 0.20, 0.10, 0.10, 0.05]),
+    "Permit Status": (["ISSUED", "RE-ISSUED", "IN PROCESS", "REVOKED"], [0.70, 0.15, 0.12, 0.03]),
+    "Permit Type": (["AL", "EW", "PL", "EQ"], [0.30, 0.40, 0.20, 0.10]),
+    "Filing Status": (["INITIAL", "RENEWAL"], [0.65, 0.35]),
+}
+
+START_DATE = pd.Timestamp("1990-01-01")
+END_DATE = pd.Timestamp("2024-12-31")
+
+
+def _dates(days):
+    return (START_DATE + pd.to_timedelta(days, unit="D")).strftime("%m/%d/%Y")
+
+
+# One chunk of PROJECT_base-shaped rows: dates as DOB text (MM/DD/YYYY),
+# right-skewed durations and subtypes with the stray spaces of the real export
+def synthetic_chunk(n, borough, rng):
+    df = pd.DataFrame({"BOROUGH": borough.upper()}, index=range(n))
+    df["Job #"] = rng.integers(100_000_000, 600_000_000, n)
+    df["Job doc. #"] = rng.choice([1, 2, 3], n, p=[0.85, 0.12, 0.03])
+    for col, (values, probs) in CHOICES.items():
+        df[col] = rng.choice(np.array(values, dtype=object), n, p=probs)
+
+    # Most permits are of the job's work type; the subtype often carries a trailing space
+    subtype = df["Work Type"].where(rng.random(n) < 0.9, rng.choice(["BL", "MH", "PL"], n))
+    df["Permit Subtype"] = subtype.where(rng.random(n) < 0.7, subtype + " ")
+    df["Permit Sequence #"] = rng.geometric(0.6, n)
+
+    # Job starts grow over the years; issuance precedes the start by a few days
+    span = (END_DATE - START_DATE).days
+    start = (np.sqrt(rng.random(n)) * span).astype(np.int64)
+    issuance = start - rng.integers(0, 30, n)
+    # Durations: short lognormal permits plus one-year permits (and a few outliers)
+    duration = np.where(rng.random(n) < 0.6,
+                        rng.lognormal(np.log(150), 0.6, n),
+                        rng.normal(365, 20, n)).astype(np.int64)
+    duration = np.where(rng.random(n) < 0.01, rng.integers(400, 4000, n), duration)
+
+    df["Issuance Date"] = _dates(issuance)
+    df["Job Start Date"] = _dates(start)
+    df["Expiration Date"] = _dates(start + duration)
+    df.loc[rng.random(n) < 0.02, "Expiration Date"] = None
+    df["Zip Code"] = rng.integers(10001, 11698, n)
+    return df
+
+
+# Rows of every sheet: n_rows split across the boroughs by their share
+def sheet_rows(n_rows):
+    shares = np.array(list(SHEETS.values()))
+    rows = np.floor(shares * n_rows).astype(np.int64)
+    rows[0] += n_rows - rows.sum()
+    return dict(zip(SHEETS, rows.tolist()))
+
+
+# Yield (sheet, chunk) for n_rows rows; every sheet has its own seeded stream
+def iter_synthetic(n_rows, seed=0, chunksize=CHUNK_SIZE):
+    streams = np.random.SeedSequence(seed).spawn(len(SHEETS))
+    for (sheet, rows), stream in zip(sheet_rows(n_rows).items(), streams):
+        rng = np.random.default_rng(stream)
+        for start in range(0, rows, chunksize):
+            yield sheet, synthetic_chunk(min(chunksize, rows - start), sheet, rng)
+
+
+def _write_xlsx(path, n_rows, seed):
+    largest = max(sheet_rows(n_rows).values())
+    if largest >= XLSX_MAX_ROWS:
+        raise ValueError(f"{largest} rows do not fit in one worksheet ({XLSX_MAX_ROWS - 1} max): use csv or parquet")
+    parts = {}
+    for sheet, chunk in iter_synthetic(n_rows, seed):
+        parts.setdefault(sheet, []).append(chunk)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for sheet, chunks in parts.items():
+            pd.concat(chunks, ignore_index=True).to_excel(writer, sheet_name=sheet, index=False)
+
+
+# One file per sheet in a folder, written chunk by chunk (any size)
+def _write_folder(path, n_rows, seed, fmt):
+    os.makedirs(path, exist_ok=True)
+    writers = {}
+    try:
+        for sheet, chunk in iter_synthetic(n_rows, seed):
+            sheet_path = os.path.join(path, f"{sheet}.{fmt}")
+            if fmt == "csv":
+                chunk.to_csv(sheet_path, mode="a" if sheet in writers else "w",
+                             header=sheet not in writers, index=False)
+                writers[sheet] = None
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                if sheet not in writers:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writers[sheet] = pq.ParquetWriter(sheet_path, schema)
+                writers[sheet].write_table(pa.Table.from_pandas(chunk, schema=writers[sheet].schema,
+                                                                preserve_index=False))
+    finally:
+        for writer in writers.values():
+            if writer is not None:
+                writer.close()
+
+
+# Write a synthetic PROJECT_base: an .xlsx workbook, or a folder of one csv/parquet file per sheet
+def write_synthetic(path, n_rows, seed=0, fmt="xlsx"):
+    if fmt == "xlsx":
+        _write_xlsx(path, n_rows, seed)
+    elif fmt in ("csv", "parquet"):
+        _write_folder(path, n_rows, seed, fmt)
+    else:
+        raise ValueError(f"unknown format: {fmt}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic PROJECT_base.xlsx-shaped permits")
+    parser.add_argument("output", help="workbook path (xlsx) or folder (csv, parquet)")
+    parser.add_argument("--rows", type=int, default=10_000, help="total rows over the five borough sheets")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"], default="xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_synthetic(args.output, args.rows, args.seed, args.format)
+    print(f"{args.rows} synthetic rows saved to:", args.output)
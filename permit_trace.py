@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Tracing is switched on from the environment, so production runs need no code change:
+#   PERMIT_TRACE=trace.jsonl   append one JSON line per stage ("-" writes to stderr)
+#   PERMIT_PROFILE=dates,cube  also run these stages under cProfile ("all" for every stage)
+#   PERMIT_PROFILE_DIR=...     where the .prof files go (default: permit_profiles)
+# Worker processes inherit the variables, so per-sheet stages in a pool are traced too.
+TRACE_ENV = "PERMIT_TRACE"
+PROFILE_ENV = "PERMIT_PROFILE"
+PROFILE_DIR_ENV = "PERMIT_PROFILE_DIR"
+PROFILE_DIR = "permit_profiles"
+
+# Stages open in this process (innermost last)
+_open = []
+
+
+def enabled():
+    return bool(os.environ.get(TRACE_ENV))
+
+
+# Turn tracing on from code (e.g. a notebook); child processes inherit the settings
+def configure(path, profile=None, profile_dir=None):
+    os.environ[TRACE_ENV] = path
+    if profile:
+        os.environ[PROFILE_ENV] = profile if isinstance(profile, str) else ",".join(profile)
+    if profile_dir:
+        os.environ[PROFILE_DIR_ENV] = profile_dir
+
+
+# Rows of a DataFrame, Series or array, summed over dicts and lists of them
+def count_rows(obj):
+    if obj is None:
+        return None
+    if isinstance(obj, (int, float)):
+        return int(obj)
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (list, tuple)):
+        counts = [count_rows(o) for o in obj if o is not None]
+        return sum(counts) if counts else None
+    return len(obj)
+
+
+def _status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+# Peak resident memory of this process in MB (None where it cannot be read)
+def peak_rss_mb():
+    peak = _status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+# Reset the peak to the current RSS (Linux only); elsewhere peaks are process-wide
+def _reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _profiled(name):
+    wanted = os.environ.get(PROFILE_ENV, "")
+    return wanted == "all" or name in [s.strip() for s in wanted.split(",")]
+
+
+def _profile_path(record):
+    label = "-".join(str(v) for v in (record["stage"], record["sheet"], record["pid"]) if v is not None)
+    profile_dir = os.environ.get(PROFILE_DIR_ENV, PROFILE_DIR)
+    os.makedirs(profile_dir, exist_ok=True)
+    return os.path.join(profile_dir, re.sub(r"[^\w.-]+", "_", label) + ".prof")
+
+
+def _emit(record):
+    line = json.dumps(record, default=str) + "\n"
+    target = os.environ.get(TRACE_ENV)
+    if target == "-":
+        sys.stderr.write(line)
+    else:
+        with open(target, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# Time one stage. The yielded dict takes the output rows (record["rows_out"] = df);
+# the sheet (the figure file for chart stages) defaults to the one of the enclosing stage.
+@contextmanager
+def stage(name, sheet=None, rows_in=None):
+    if not enabled():
+        yield {}
+        return
+
+    if sheet is None and _open:
+        sheet = _open[-1]["sheet"]
+    record = {"stage": name, "sheet": sheet, "script": os.path.basename(sys.argv[0]) or None,
+              "pid": os.getpid(), "rows_in": count_rows(rows_in), "rows_out": None}
+
+    # The enclosing stages keep the peak reached so far before it is reset
+    peak = peak_rss_mb()
+    for parent in _open:
+        parent["_peak"] = max(parent["_peak"] or 0, peak or 0) if peak is not None else None
+    _reset_peak()
+    record["_peak"] = peak_rss_mb()
+    _open.append(record)
+
+    profiler = None
+    if _profiled(name):
+        import cProfile
+        profiler = cProfile.Profile()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        record["wall_s"] = round(time.perf_counter() - wall, 6)
+        record["cpu_s"] = round(time.process_time() - cpu, 6)
+        _open.pop()
+        peak = peak_rss_mb()
+        start_peak = record.pop("_peak")
+        record["peak_rss_mb"] = None if peak is None else round(max(peak, start_peak or 0), 1)
+        for parent in _open:
+            if parent["_peak"] is not None and peak is not None:
+                parent["_peak"] = max(parent["_peak"], peak)
+        record["rows_out"] = count_rows(record["rows_out"])
+        if profiler is not None:
+            record["profile"] = _profile_path(record)
+            profiler.dump_stats(record["profile"])
+        record["ts"] = time.time()
+        _emit(record)
+
+
+# Totals per stage of a trace file, slowest first
+def summarize(path):
+    records = pd.read_json(path, lines=True)
+    summary = records.groupby("stage").agg(
+        calls=("stage", "size"), wall_s=("wall_s", "sum"), cpu_s=("cpu_s", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"), rows_in=("rows_in", "sum"), rows_out=("rows_out", "sum"))
+    return summary.sort_values("wall_s", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summary of a PERMIT_TRACE file")
+    parser.add_argument("trace")
+    parser.add_argument("--by-sheet", action="store_true", help="one line per stage and sheet")
+    args = parser.parse_args()
+
+    if args.by_sheet:
+        records = pd.read_json(args.trace, lines=True)
+        table = records.groupby(["stage", "sheet"], dropna=False)[["wall_s", "cpu_s", "peak_rss_mb"]].agg(
+            {"wall_s": "sum", "cpu_s": "sum", "peak_rss_mb": "max"})
+    else:
+        table = summarize(args.trace)
+    print(table.round(3).to_string())
@@ -0,0 +1,85 @@
+import argparse
+import hashlib
+import itertools
+import os
+
+import pandas as pd
+
+from batch_score import FEATURES, load_models, score
+from permit_cache import CACHE_DIR_NAME, file_hash
+
+MODEL_FILES = ["encoder.pkl", "model_duration.pkl", "model_sequence.pkl"]
+PREDICTION_COLUMNS = ["Predicted Duration", "Predicted Permit Sequence"]
+
+
+# Version of the three pickles: hash of their hashes
+def model_version(model_dir="."):
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        digest.update(file_hash(os.path.join(model_dir, name)).encode())
+    return digest.hexdigest()
+
+
+# Values of every model input: the encoder's categories, or the dataset's values as a fallback
+def input_space(encoder, df=None):
+    names = list(getattr(encoder, "feature_names_in_", FEATURES))
+    categories = getattr(encoder, "categories_", None)
+    if categories is not None:
+        space = {name: list(values) for name, values in zip(names, categories)}
+    elif df is not None:
+        space = {col: list(df[col].dropna().unique()) for col in FEATURES}
+    else:
+        raise ValueError("the encoder has no categories_; pass the dataset to enumerate the inputs")
+    return {col: space[col] for col in FEATURES}
+
+
+# Score the full cartesian product of the inputs in one batch
+def build_table(models, space):
+    grid = pd.DataFrame(list(itertools.product(*space.values())), columns=list(space))
+    return score(grid, models)
+
+
+def _table_path(model_dir, version):
+    return os.path.join(model_dir, CACHE_DIR_NAME, "predictions", f"predictions_{version[:16]}.parquet")
+
+
+# Lookup table for the current model version; the pickles are loaded only when it must be built
+# (mmap_mode as in batch_score.load_models, e.g. "r" to share the arrays between processes)
+def load_table(model_dir=".", df=None, mmap_mode=None):
+    path = _table_path(model_dir, model_version(model_dir))
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    models = load_models(model_dir, mmap_mode=mmap_mode)
+    table = build_table(models, input_space(models[2], df))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table.to_parquet(path, index=False)
+    return table
+
+
+# {(Work Type, Borough, Fascia_Edificio): (duration, permit sequence)}
+def prediction_lookup(table):
+    keys = zip(*(table[col] for col in FEATURES))
+    values = zip(*(table[col] for col in PREDICTION_COLUMNS))
+    return dict(zip(keys, values))
+
+
+# Write the table as .csv, .json or .parquet for services that do not load the pickles
+def export_table(table, path):
+    if path.lower().endswith(".json"):
+        table.to_json(path, orient="records", indent=2)
+    elif path.lower().endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precomputed predictions for every model input")
+    parser.add_argument("--models", default=".", help="folder with model_duration.pkl, model_sequence.pkl, encoder.pkl")
+    parser.add_argument("--export", default="predictions.csv", help=".csv, .json or .parquet output")
+    args = parser.parse_args()
+
+    table = load_table(args.models)
+    export_table(table, args.export)
+    print(f"{len(table)} predictions (model version {model_version(args.models)[:16]}) saved to:", args.export)
@@ -0,0 +1,116 @@
+import datetime
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Scenario dimensions of the HVAC tool; None in a key means "Totale" (any value)
+KEY_COLUMNS = ["Fascia_Edificio", "Borough", "Work Type"]
+WILDCARD_COLUMNS = ["Fascia_Edificio", "Borough"]
+VALUE_COLUMNS = ["Duration", "Permit Sequence"]
+# Date the time windows ("Ultimi 10 anni") are taken on
+DATE_COLUMN = "Job Start Date"
+
+# Thresholds (days) of the tool's renewal slider
+CURVE_THRESHOLDS = np.arange(30, 366)
+
+
+def _read_only(values):
+    values.setflags(write=False)
+    return values
+
+
+# Map every (band, borough, work type) combination, with None wildcards for band and
+# borough, to pre-sliced read-only arrays of Duration and Permit Sequence, plus the
+# sorted durations used for the exceedance probabilities. With a date column the rows of
+# each segment are kept in date order (undated last), so a time window is a contiguous slice.
+def build_index(df, date_col=None):
+    segments = {}
+    for n_wild in range(len(WILDCARD_COLUMNS) + 1):
+        for wild in combinations(WILDCARD_COLUMNS, n_wild):
+            by = [c for c in KEY_COLUMNS if c not in wild]
+            for values, rows in df.groupby(by, sort=False, observed=True):
+                named = dict(zip(by, values))
+                key = tuple(named.get(c) for c in KEY_COLUMNS)
+                if date_col is not None:
+                    rows = rows.sort_values(date_col, kind="stable", na_position="last")
+                arrays = {}
+                for col in VALUE_COLUMNS:
+                    arrays[col] = _read_only(rows[col].to_numpy(copy=True))
+                arrays["Duration sorted"] = _read_only(np.sort(arrays["Duration"]))
+                if date_col is not None:
+                    arrays["Dates"] = _read_only(rows[date_col].to_numpy(dtype="datetime64[ns]"))
+                    arrays["Dated"] = int(rows[date_col].notna().sum())
+                segments[key] = arrays
+
+    options = {col: list(df[col].unique()) for col in KEY_COLUMNS}
+    dates = None
+    if date_col is not None and df[date_col].notna().any():
+        dates = (df[date_col].min().date(), df[date_col].max().date())
+    return {"segments": segments, "options": options, "dates": dates}
+
+
+# Slice of a segment's rows dated within [start, end] (whole days; None leaves a side open):
+# two binary searches over the date-sorted rows, so no row is scanned
+def _bounds(segment, start, end):
+    dates = segment["Dates"]
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+    hi = segment["Dated"] if end is None else \
+        int(np.searchsorted(dates, np.datetime64(end, "D") + 1, side="left"))
+    return lo, hi
+
+
+# The segment restricted to a date window (views of its arrays), or None when it is empty
+def window(segment, start=None, end=None):
+    if segment is None or (start is None and end is None):
+        return segment
+    lo, hi = _bounds(segment, start, end)
+    if hi <= lo:
+        return None
+    arrays = {col: segment[col][lo:hi] for col in VALUE_COLUMNS + ["Dates"]}
+    arrays["Duration sorted"] = _read_only(np.sort(arrays["Duration"]))
+    arrays["Dated"] = hi - lo
+    return arrays
+
+
+# Arrays of one scenario in constant time (restricted to a date window when given),
+# or None when no rows match
+def lookup(index, building_class, borough, work_type, start=None, end=None):
+    return window(index["segments"].get((building_class, borough, work_type)), start, end)
+
+
+# Number of rows of a segment in the window, from the same binary searches
+def window_size(segment, start=None, end=None):
+    if start is None and end is None:
+        return len(segment["Duration"])
+    lo, hi = _bounds(segment, start, end)
+    return max(0, hi - lo)
+
+
+# Values offered by the tool's selectboxes: with a window, only those having rows in it
+def options(index, col, start=None, end=None):
+    if start is None and end is None:
+        return index["options"][col]
+    pos = KEY_COLUMNS.index(col)
+    others = [KEY_COLUMNS.index(c) for c in WILDCARD_COLUMNS if c != col]
+    return [value for value in index["options"][col]
+            if any(key[pos] == value and all(key[i] is None for i in others) and window_size(segment, start, end)
+                   for key, segment in index["segments"].items())]
+
+
+# (first day, last day) of the trailing `years` years of the data
+def trailing_window(index, years):
+    last = index["dates"][1]
+    start = (pd.Timestamp(last) - pd.DateOffset(years=years)).date() + datetime.timedelta(days=1)
+    return start, last
+
+
+# Observed share of durations above each threshold: one binary search over the sorted array
+def exceedance(segment, thresholds):
+    durations = segment["Duration sorted"]
+    return 1.0 - np.searchsorted(durations, thresholds, side="right") / len(durations)
+
+
+# Exceedance probability for every slider threshold in one vectorized call
+def exceedance_curve(segment, thresholds=CURVE_THRESHOLDS):
+    return dict(zip(thresholds.tolist(), exceedance(segment, thresholds).tolist()))
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chart_book
+from chart_book import CHART_BOOK, render_book
+from permit_dates import parse_dates
+from permit_pipeline import DURATION_LIMITS
+from permit_synth import synthetic_chunk
+
+
+def _jobs(sheets, monkeypatch):
+    monkeypatch.setattr(chart_book, "render_jobs", lambda jobs, **kwargs: None)
+    return {job["path"]: job for job in render_book(sheets, CHART_BOOK, "out")}
+
+
+# The cube rollups give the same mean durations as the rows they were built from
+def test_mean_durations_from_cube(monkeypatch):
+    rng = np.random.default_rng(0)
+    sheets = {borough: synthetic_chunk(2000, borough, rng) for borough in ["Bronx", "Queens"]}
+    for df in sheets.values():
+        df["Duration"] = (parse_dates(df["Expiration Date"]) - parse_dates(df["Job Start Date"])).dt.days
+    jobs = _jobs(sheets, monkeypatch)
+
+    rows = pd.concat([df.assign(Borough=name) for name, df in sheets.items()], ignore_index=True)
+    rows["Permit Subtype"] = rows["Permit Subtype"].str.strip()
+    rows = rows.dropna(subset=["Permit Subtype", "Duration"])
+    cleaned = rows[rows["Duration"] <= rows["Permit Subtype"].map(DURATION_LIMITS)]
+    for name, subset in [("unified_grouped_permit_duration.png", rows),
+                         ("unified_grouped_permit_duration_cleaned.png", cleaned)]:
+        data = jobs[os.path.join("out", name)]["data"]
+        assert data["groups"] == ["Bronx", "Queens", "NYC"]
+        for subtype in ["MH", "BL"]:
+            mine = subset[subset["Permit Subtype"] == subtype]
+            expected = mine.groupby("Borough")["Duration"].mean().tolist() + [mine["Duration"].mean()]
+            np.testing.assert_allclose(data["values"][subtype], expected)
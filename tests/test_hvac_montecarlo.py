@@ -0,0 +1,24 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hvac_montecarlo import simulation_summary
+
+
+def _segment(durations):
+    return pd.DataFrame({"Duration": durations, "Permit Sequence": [1] * len(durations)})
+
+
+# Segments whose draws stay non-positive (NaN) still give a histogram and percentiles
+def test_summary_of_degenerate_segments():
+    few = simulation_summary(_segment([-150.0, -100.0, -50.0]), n_samples=2000, seed=0)
+    assert 0 < few["counts"].sum() < 2000
+    assert 0 < few["p5"] < few["p95"]
+
+    zero = simulation_summary(_segment([0.0]), n_samples=2000, seed=0)
+    assert zero["counts"].sum() == 0
+    assert np.isnan(zero["p5"]) and np.isnan(zero["p95"])
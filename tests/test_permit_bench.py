@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from permit_bench import run_benchmark
+
+
+# Every stage of a small run, for each folder format (parquet has no Borough column)
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_benchmark_smoke(tmp_path, fmt):
+    results = tmp_path / "results.jsonl"
+    records = run_benchmark([2000], fmt, str(tmp_path / "work"), str(results))
+
+    assert list(records["stage"]) == ["generate", "pipeline", "cube", "charts"]
+    assert (records["stage_rows"] > 0).all()
+    assert len(pd.read_json(results, lines=True)) == len(records)
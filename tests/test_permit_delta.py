@@ -0,0 +1,84 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from permit_delta import apply_delta, compact_store, load_store, permit_keys, read_delta
+from permit_synth import synthetic_chunk
+
+
+def test_permit_keys_match_across_dtypes():
+    stored = pd.DataFrame({
+        "Job #": ["B123", "120", "5"],
+        "Job doc. #": pd.array([1, 2, None], dtype="Int16"),
+        "Permit Sequence #": pd.array([1, 2, 3], dtype="Int16"),
+    })
+    delta = pd.DataFrame({
+        "Job #": ["B123 ", 120.0, 5],
+        "Job doc. #": [1.0, 2.0, np.nan],
+        "Permit Sequence #": [1.0, 2.0, 3.0],
+    })
+    assert permit_keys(stored).tolist() == permit_keys(delta).tolist()
+
+
+# A csv delta with one blank key cell reads its key columns as float: the
+# re-sent permits must still replace the stored ones
+def test_csv_delta_with_blank_key_replaces_rows(tmp_path):
+    base = synthetic_chunk(2000, "Bronx", np.random.default_rng(0))
+    base.to_csv(tmp_path / "Bronx.csv", index=False)
+    store = str(tmp_path / "store")
+    apply_delta(read_delta(str(tmp_path / "Bronx.csv")), store)
+    before = load_store(store)["Bronx"]
+
+    resent = base.iloc[:100].copy()
+    resent["Job doc. #"] = resent["Job doc. #"].astype(float)
+    resent.loc[resent.index[0], "Job doc. #"] = np.nan
+    resent.to_csv(tmp_path / "Bronx.csv", index=False)
+    apply_delta(read_delta(str(tmp_path / "Bronx.csv")), store)
+    after = load_store(store)["Bronx"]
+
+    assert not permit_keys(after).duplicated().any()
+    # Only the row whose key lost its Job doc. # can be added as a new permit
+    assert len(before) <= len(after) <= len(before) + 1
+
+
+# A delta becomes a new part: stored parts are not rewritten, and compaction keeps the current rows
+def test_delta_is_written_as_a_new_part(tmp_path):
+    base = synthetic_chunk(2000, "Bronx", np.random.default_rng(1))
+    store = str(tmp_path / "store")
+    apply_delta({"Bronx": base}, store)
+    first = os.path.join(store, "Bronx", "part-00000.parquet")
+    written = os.path.getmtime(first)
+
+    resent = base.iloc[:100].copy()
+    apply_delta({"Bronx": resent}, store)
+    assert os.path.getmtime(first) == written
+    current = load_store(store)["Bronx"]
+    assert not permit_keys(current).duplicated().any()
+
+    compact_store(store)
+    assert sorted(os.listdir(os.path.join(store, "Bronx"))) == ["part-00002.keys.parquet", "part-00002.parquet"]
+    assert len(load_store(store)["Bronx"]) == len(current)
+
+
+# Without an explicit cutoff the year of the refresh is used: once it moves on, permits
+# that expired in the meantime flip to COMPLETED even when no delta touches them
+def test_job_finish_flips_when_the_refresh_year_advances(tmp_path, monkeypatch):
+    import permit_delta
+
+    base = synthetic_chunk(2000, "Bronx", np.random.default_rng(2))
+    store = str(tmp_path / "store")
+    monkeypatch.setattr(permit_delta, "refresh_cutoff_year", lambda today=None: 2020)
+    apply_delta({"Bronx": base}, store)
+    before = load_store(store)["Bronx"]
+    expiring = before["Expiration Date"].dt.year.between(2020, 2022)
+    assert (before.loc[expiring, "Job Finish"] == "NOT COMPLETED").all()
+
+    monkeypatch.setattr(permit_delta, "refresh_cutoff_year", lambda today=None: 2023)
+    summary = apply_delta({}, store)
+    after = load_store(store)["Bronx"]
+    assert summary["refreshed"] == int(expiring.sum()) > 0
+    assert (after.loc[expiring, "Job Finish"] == "COMPLETED").all()
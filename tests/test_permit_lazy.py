@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("polars")
+
+from permit_cube import DIMS, HIST_COLUMNS, build_cube
+from permit_lazy import build_cube_lazy
+from permit_synth import synthetic_chunk
+
+
+def _sorted(cube):
+    return cube.sort_values(DIMS, na_position="last").reset_index(drop=True)
+
+
+# The polars cube equals the pandas one, including cells without a height band (e.g. PL)
+def test_lazy_cube_matches_pandas_cube(tmp_path):
+    rng = np.random.default_rng(0)
+    sheets = {borough: synthetic_chunk(3000, borough, rng) for borough in ["Bronx", "Manhattan"]}
+    for borough, df in sheets.items():
+        df.to_parquet(tmp_path / f"{borough}.parquet", index=False)
+
+    expected = build_cube(sheets, duration_from="Job Start Date")
+    cube = build_cube_lazy(str(tmp_path), duration_from="Job Start Date")
+
+    assert expected["Band"].isna().any()
+    assert expected["Cleaned"].nunique() == 2 and expected["Issuance Band"].notna().any()
+    assert not cube[HIST_COLUMNS].isna().any().any()
+    assert (cube[HIST_COLUMNS].dtypes == "int64").all()
+    pd.testing.assert_frame_equal(_sorted(cube)[expected.columns], _sorted(expected), check_categorical=False)
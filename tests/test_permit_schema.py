@@ -0,0 +1,23 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from permit_cache import typed_columns
+from permit_pipeline import selection_mask
+from permit_synth import synthetic_chunk
+
+
+# The schema must not change which rows are selected: padded selection values stay padded
+def test_typed_columns_keep_the_selection(tmp_path):
+    rng = np.random.default_rng(0)
+    raw = synthetic_chunk(2000, "Bronx", rng)
+    padded = rng.random(len(raw)) < 0.3
+    raw.loc[padded, "Work Type"] = raw.loc[padded, "Work Type"].astype(str) + "  "
+    raw["Permit Subtype"] = raw["Permit Subtype"].astype(str) + " "
+
+    typed = typed_columns(raw)
+    assert np.array_equal(selection_mask(typed), selection_mask(raw))
+    assert (typed["Permit Subtype"].astype(str) == raw["Permit Subtype"].str.strip()).all()